@@ -0,0 +1,228 @@
+"""ASGI entry point: an asyncio serving path in front of the Flask app.
+
+    AI_SERVICE_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn --config gunicorn.conf.py asgi:app
+
+The event loop never runs model code. /predict/traffic and the non-streamed
+/forecast/traffic answer cache hits on the loop and hand misses to a bounded
+thread pool (utils.inference_pool), where concurrent identical requests share
+one computation. /health is answered on the loop, so it stays responsive
+under load. Native responses carry the same CORS headers flask-cors adds.
+Every other route is the Flask app behind a2wsgi, which streams request and
+response bodies instead of buffering them. When AI_ASYNC_MAX_PENDING
+requests are already in flight on either path, requests get an immediate
+503 with Retry-After rather than queueing. The model watcher and trend
+poller start at lifespan startup, since native routes skip Flask's hooks.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from flask_cors.core import get_cors_headers, get_cors_options
+from werkzeug.datastructures import Headers
+
+import main as service
+from services.model_registry import ModelNotFound
+from utils.cache import hour_bucket, next_hour
+from utils.inference_pool import REJECTED, InferencePool, PoolSaturated
+
+ASYNC_THREADS = int(os.environ.get('AI_ASYNC_THREADS', 8))
+ASYNC_MAX_PENDING = int(os.environ.get('AI_ASYNC_MAX_PENDING', 64))
+
+pool = InferencePool(max_workers=ASYNC_THREADS, max_pending=ASYNC_MAX_PENDING)
+
+def _terminated_input(environ, start_response):
+    # a2wsgi's input ends with the request body, so chunked uploads (NDJSON streams) can be read to EOF
+    environ['wsgi.input_terminated'] = True
+    return service.app(environ, start_response)
+
+# Every other route: the Flask app in a2wsgi's own thread pool
+flask_app = WSGIMiddleware(_terminated_input, workers=ASYNC_THREADS)
+
+# Flask requests in flight through flask_app
+_wsgi_pending = 0
+
+# Options of the app's CORS(app), applied to native responses too
+CORS_OPTIONS = get_cors_options(service.app)
+
+# Same as wsgi.py: with preload_app this runs once in the gunicorn master
+service.load_models()
+
+class HTTPError(Exception):
+    def __init__(self, status, payload, headers=()):
+        super().__init__(status)
+        self.status = status
+        self.payload = payload
+        self.headers = list(headers)
+
+def _cached_headers(etag, now):
+    if etag is None:
+        # Not cacheable, e.g. a fallback prediction for an unknown location
+        return [('cache-control', 'no-store')]
+    return [
+        ('etag', f'"{etag}"'),
+        ('cache-control', f'public, max-age={max(0, int((next_hour(now) - now).total_seconds()))}')
+    ]
+
+async def _cached(key, now, compute, coalesce_key):
+    """Payload for key straight from the response cache, else computed once in the pool.
+
+    Pinned models pass key=None: their cache key depends on the resolved version,
+    so the lookup happens in compute.
+    """
+    cached = service.response_cache.get((key, hour_bucket(now))) if key else None
+    if cached is None:
+        cached = await pool.run(compute, key=coalesce_key + (hour_bucket(now),))
+    body, etag = cached
+    return 200, body, _cached_headers(etag, now)
+
+async def predict_traffic(query):
+    location = query.get('location', 'Central Square')
+    version, district = query.get('model_version'), query.get('district')
+    now = datetime.now()
+
+    def compute():
+        predictor, pinned = service.resolve_model('traffic', service.traffic_predictor, version, district)
+        return service.cached_payload(
+            ('traffic', location) + pinned, now,
+            lambda: service.traffic_prediction(predictor, location, now),
+            cacheable=service.traffic_cacheable(predictor, location)
+        )
+
+    try:
+        pinned = version is not None or district is not None
+        key = ('traffic', location)
+        return await _cached(None if pinned else key, now, compute, key + (version, district))
+    except (ModelNotFound, PoolSaturated):
+        raise
+    except Exception as e:
+        service.logger.error(f"Error in traffic prediction: {str(e)}")
+        raise HTTPError(500, {
+            "error": "Prediction service temporarily unavailable",
+            "fallback_prediction": "Moderate traffic expected"
+        })
+
+async def forecast_traffic(query):
+    try:
+        locations, hours, weather = service.parse_forecast_args(query)
+    except ValueError as e:
+        raise HTTPError(400, {"error": str(e)})
+
+    version, district = query.get('model_version'), query.get('district')
+    now = datetime.now()
+    key = ('forecast', tuple(locations or ()), hours, weather)
+
+    def compute():
+        model, pinned = service.resolve_model('advanced', service.advanced_traffic_model, version, district)
+        return service.cached_payload(
+            key + pinned, now,
+            lambda: service.forecast_payload(model, locations, hours, weather, now),
+            cacheable=model.is_trained
+        )
+
+    try:
+        pinned = version is not None or district is not None
+        return await _cached(None if pinned else key, now, compute, key + (version, district))
+    except (ModelNotFound, PoolSaturated):
+        raise
+    except Exception as e:
+        service.logger.error(f"Error in traffic forecast: {str(e)}")
+        raise HTTPError(500, {"error": "Forecast service temporarily unavailable"})
+
+async def health(query):
+    return 200, json.dumps(service.health_payload()), []
+
+# (method, path) -> handler answered on the event loop, everything else goes to Flask
+ROUTES = {
+    ('GET', '/predict/traffic'): predict_traffic,
+    ('GET', '/forecast/traffic'): forecast_traffic,
+    ('GET', '/health'): health
+}
+
+def _not_modified(headers, etag_header):
+    candidates = [tag.strip() for tag in headers.get(b'if-none-match', b'').decode('latin-1').split(',')]
+    return etag_header in candidates or '*' in candidates
+
+async def _respond(send, status, body, headers=(), content_type='application/json'):
+    body = body.encode() if isinstance(body, str) else body
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode()),
+            (b'content-length', str(len(body)).encode())
+        ] + [(name.encode(), value.encode()) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def _cors_headers(scope):
+    request_headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+    cors = get_cors_headers(CORS_OPTIONS, request_headers, scope['method'])
+    return [(name.lower(), str(value)) for name, value in cors.items(multi=True)]
+
+def _query(scope):
+    return dict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+
+async def _native(handler, scope, send):
+    started = time.perf_counter()
+    query = _query(scope)
+    headers = dict(scope['headers'])
+
+    try:
+        status, body, response_headers = await handler(query)
+    except HTTPError as e:
+        status, body, response_headers = e.status, json.dumps(e.payload), e.headers
+    except ModelNotFound as e:
+        status, body, response_headers = 404, json.dumps({"error": f"Unknown model version {e.args[0]}"}), []
+    except PoolSaturated:
+        status, body, response_headers = 503, json.dumps({"error": "Service busy, retry shortly"}), [('retry-after', '1')]
+
+    etag = dict(response_headers).get('etag')
+    if status == 200 and etag and _not_modified(headers, etag):
+        status, body = 304, b''
+
+    await _respond(send, status, body, response_headers + _cors_headers(scope))
+    service.REQUESTS.inc(endpoint=scope['path'], method=scope['method'], status=status)
+    service.REQUEST_LATENCY.observe(time.perf_counter() - started, endpoint=scope['path'])
+
+async def _wsgi(scope, receive, send):
+    """Hand the request to the Flask app, or answer 503 when too many are already in flight"""
+    global _wsgi_pending
+    if _wsgi_pending >= ASYNC_MAX_PENDING:
+        REJECTED.inc()
+        await _respond(send, 503, json.dumps({"error": "Service busy, retry shortly"}),
+                       [('retry-after', '1')] + _cors_headers(scope))
+        return
+
+    _wsgi_pending += 1
+    try:
+        await flask_app(scope, receive, send)
+    finally:
+        _wsgi_pending -= 1
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Each worker starts its own, after gunicorn's fork
+            service.start_background_threads()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            pool.shutdown()
+            flask_app.executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    # Streamed forecasts keep their chunked Flask response
+    if handler is forecast_traffic and _query(scope).get('stream') == '1':
+        handler = None
+    if handler is not None:
+        return await _native(handler, scope, send)
+    return await _wsgi(scope, receive, send)
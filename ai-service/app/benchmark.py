@@ -0,0 +1,259 @@
+"""Reproducible benchmarks for the AI service hot paths.
+
+Run from the service root:
+
+    python app/benchmark.py [--quick] [--name benchmark]
+
+Models are trained into a temporary directory with fixed seeds, so existing
+artifacts are left alone. Results are printed and saved through
+utils.helpers.save_model_metrics (models/<name>_metrics.json).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from models.anomaly_detector import AnomalyDetector
+from models.emergency_predictor import EmergencyPredictor
+from models.flat_forest import FlatForest
+from models.lookup_tables import export_tables
+from models.traffic_predictor import AdvancedTrafficModel, TrafficPredictor
+from services.data_processor import DataProcessor
+from utils.helpers import save_model_metrics
+
+def measure(fn, iterations, items=1, warmup=3):
+    """Run fn repeatedly and summarize per-call latency (ms) and throughput (items/s)"""
+    for _ in range(warmup):
+        fn()
+
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99]) * 1000
+    return {
+        'iterations': iterations,
+        'items_per_call': items,
+        'p50_ms': round(p50, 4),
+        'p95_ms': round(p95, 4),
+        'p99_ms': round(p99, 4),
+        'mean_ms': round(timings.mean() * 1000, 4),
+        'throughput_per_s': round(items * iterations / timings.sum(), 1)
+    }
+
+def synthetic_emergencies(n_samples, rng):
+    """Emergency incident history shaped like DataProcessor.process_emergency_data output"""
+    return pd.DataFrame({
+        'location': rng.choice(['Highway I-95', 'Central Park', 'Downtown', 'Main Hospital'], n_samples),
+        'type': rng.choice(['ACCIDENT', 'FIRE', 'MEDICAL', 'CRIME'], n_samples),
+        'severity': rng.integers(1, 6, n_samples),
+        'hour': rng.integers(0, 24, n_samples),
+        'day_of_week': rng.integers(0, 7, n_samples),
+        'month': rng.integers(1, 13, n_samples)
+    })
+
+def synthetic_traffic_rows(n_samples, rng):
+    """Raw traffic_data rows as they come out of the database"""
+    start = datetime(2024, 1, 1)
+    locations = ['Main St & 1st Ave', 'Central Square', 'Highway I-95', 'Bridge Entrance', 'Tunnel Exit']
+    return [
+        {
+            'location': locations[i % len(locations)],
+            'congestion_level': int(rng.integers(1, 11)),
+            'vehicle_count': int(rng.integers(50, 900)),
+            'timestamp': start + timedelta(minutes=5 * i)
+        }
+        for i in range(n_samples)
+    ]
+
+# Startup of each serving mode, measured in a fresh interpreter: (import statement, model load call)
+STARTUP_MODES = {
+    'full': ('import main as service', 'service.load_models()'),
+    'lite': ('import lite as service', 'service.load_tables()')
+}
+
+STARTUP_PROBE = '''
+import json, resource, sys, time
+started = time.perf_counter()
+{import_statement}
+imported = time.perf_counter()
+{load_call}
+loaded = time.perf_counter()
+
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux and would report the benchmark's own peak; VmHWM does not
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({{
+    'import_seconds': round(imported - started, 3),
+    'load_seconds': round(loaded - imported, 3),
+    'max_rss_mb': round(peak_rss_kb() / 1024, 1),
+    'pandas_imported': 'pandas' in sys.modules,
+    'sklearn_imported': 'sklearn' in sys.modules
+}}))
+'''
+
+def startup_report(service_root):
+    """Import time, load time and peak RSS of main.py and lite.py, each in a new process under service_root"""
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    report = {}
+    for mode, (import_statement, load_call) in STARTUP_MODES.items():
+        probe = STARTUP_PROBE.format(import_statement=import_statement, load_call=load_call)
+        output = subprocess.run(
+            [sys.executable, '-c', probe], cwd=service_root, capture_output=True, text=True, check=True,
+            env={**os.environ, 'PYTHONPATH': app_dir, 'AI_MODEL_WATCH_INTERVAL': '0'}
+        ).stdout
+        report[mode] = json.loads(output.strip().splitlines()[-1])
+    return report
+
+def run_benchmarks(iterations, model_dir):
+    """Train the models into model_dir and benchmark every hot path"""
+    random.seed(0)
+    np.random.seed(0)
+    rng = np.random.default_rng(0)
+    results = {}
+
+    def timed(fn):
+        started = time.perf_counter()
+        fn()
+        return round(time.perf_counter() - started, 3)
+
+    # Training
+    traffic_predictor = TrafficPredictor()
+    traffic_predictor.model_path = os.path.join(model_dir, 'traffic_predictor.joblib')
+    advanced_model = AdvancedTrafficModel()
+    advanced_model.model_path = os.path.join(model_dir, 'traffic_model.joblib')
+    emergency_predictor = EmergencyPredictor()
+    anomaly_detector = AnomalyDetector()
+    anomaly_detector.model_path = os.path.join(model_dir, 'anomaly_detector.joblib')
+    emergencies = synthetic_emergencies(5000, rng)
+
+    results['training_seconds'] = {
+        'traffic_predictor': timed(traffic_predictor.train_model),
+        'advanced_traffic_model': timed(advanced_model.train),
+        'emergency_predictor': timed(lambda: emergency_predictor.train(emergencies)),
+        'anomaly_detector': timed(anomaly_detector.train)
+    }
+    traffic_predictor.save_model()
+    results['training_seconds']['traffic_predictor_load'] = timed(TrafficPredictor().load_model)
+
+    # Model inference
+    locations = list(traffic_predictor.location_index)
+    queries = [(locations[i % len(locations)], i % 24, i % 7) for i in range(1000)]
+    incidents = emergencies.head(1000)
+    readings = anomaly_detector.create_synthetic_data(1000, random_state=1)
+
+    results['traffic_predict'] = measure(lambda: traffic_predictor.predict('Central Square', 8, 1), iterations)
+    results['traffic_predict_batch_1000'] = measure(
+        lambda: traffic_predictor.predict_batch(queries), max(10, iterations // 20), items=len(queries))
+    results['advanced_predict'] = measure(
+        lambda: advanced_model.predict('Central Square', 8, 1, 6, 'rain'), iterations)
+    results['emergency_predict'] = measure(
+        lambda: emergency_predictor.predict('Downtown', 'FIRE', 8, 1, 6), iterations)
+    results['emergency_predict_batch_1000'] = measure(
+        lambda: emergency_predictor.predict_batch(incidents), max(10, iterations // 20), items=len(incidents))
+    results['anomaly_detect_1'] = measure(lambda: anomaly_detector.detect(readings[:1]), iterations)
+    results['anomaly_detect_1000'] = measure(
+        lambda: anomaly_detector.detect(readings), max(10, iterations // 20), items=len(readings))
+
+    # Raw forest inference, sklearn against the flattened export
+    forest_probe = FlatForest.from_sklearn(advanced_model.model)
+    probe_rows = forest_probe.probe_inputs(1000)
+    results['forest_predict_1_sklearn'] = measure(
+        lambda: advanced_model.model.predict(probe_rows[:1]), max(10, iterations // 10))
+    results['forest_predict_1_flat'] = measure(lambda: forest_probe.predict(probe_rows[:1]), iterations)
+    results['forest_predict_1000_sklearn'] = measure(
+        lambda: advanced_model.model.predict(probe_rows), max(10, iterations // 20), items=len(probe_rows))
+    results['forest_predict_1000_flat'] = measure(
+        lambda: forest_probe.predict(probe_rows), max(10, iterations // 20), items=len(probe_rows))
+
+    # Data generation and ingestion
+    processor = DataProcessor()
+    traffic_rows = synthetic_traffic_rows(10000, rng)
+    results['create_synthetic_data_100k'] = measure(
+        lambda: advanced_model.create_synthetic_data(100000, random_state=0), 5, items=100000, warmup=1)
+    results['process_traffic_data_10k'] = measure(
+        lambda: processor.process_traffic_data(traffic_rows), 10, items=len(traffic_rows), warmup=1)
+
+    # End-to-end endpoints through the Flask test client
+    import main as service
+    service.swap_traffic_predictor(traffic_predictor)
+    service.anomaly_detector = anomaly_detector
+    client = service.app.test_client()
+    batch_body = {'queries': [{'location': l, 'hour': h, 'day_of_week': d} for l, h, d in queries[:100]]}
+
+    def uncached_traffic():
+        service.response_cache.clear()
+        client.get('/predict/traffic?location=Central%20Square')
+
+    results['endpoint_predict_traffic_cached'] = measure(
+        lambda: client.get('/predict/traffic?location=Central%20Square'), iterations)
+    results['endpoint_predict_traffic_uncached'] = measure(uncached_traffic, iterations)
+    results['endpoint_predict_traffic_batch_100'] = measure(
+        lambda: client.post('/predict/traffic/batch', json=batch_body), max(10, iterations // 10), items=100)
+    results['endpoint_analyze_trends'] = measure(lambda: client.get('/analyze/trends'), iterations)
+    results['endpoint_health'] = measure(lambda: client.get('/health'), iterations)
+
+    # Startup of both serving modes from the artifacts trained above
+    export_tables(os.path.join(model_dir, 'lookup_tables.npz'), traffic_predictor, advanced_model)
+    service_root = os.path.join(model_dir, 'service')
+    os.makedirs(service_root)
+    os.symlink(model_dir, os.path.join(service_root, 'models'))
+    results['startup'] = startup_report(service_root)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI service hot paths")
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help="Calls per single-item benchmark (default: 1000)")
+    parser.add_argument('--quick', action='store_true',
+                        help="Run a short smoke benchmark (100 iterations)")
+    parser.add_argument('--name', default='benchmark',
+                        help="Metrics name, saved as models/<name>_metrics.json")
+    args = parser.parse_args()
+
+    iterations = 100 if args.quick else args.iterations
+    with tempfile.TemporaryDirectory() as model_dir:
+        results = run_benchmarks(iterations, model_dir)
+
+    report = {
+        'timestamp': datetime.now(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+    for name, result in results.items():
+        if 'p50_ms' in result:
+            print(f"{name:40s} p50={result['p50_ms']:9.4f}ms p95={result['p95_ms']:9.4f}ms "
+                  f"p99={result['p99_ms']:9.4f}ms {result['throughput_per_s']:>12,.1f}/s")
+        else:
+            print(f"{name:40s} {result}")
+
+    os.makedirs('models', exist_ok=True)
+    save_model_metrics(args.name, report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Inference-only entry point serving the precomputed tables with NumPy alone.
+
+    AI_SERVICE_WORKERS=8 gunicorn --config gunicorn.conf.py lite:app
+
+Serves /predict/traffic, /forecast/traffic, /predictions/published, /health
+and /metrics from the lookup tables train.py exports (models/lookup_tables.npz,
+see models.lookup_tables) and the publisher's snapshot file. pandas,
+scikit-learn and joblib are never imported, which cuts startup time and
+resident memory per worker; everything else (batch and off-grid predictions,
+anomalies, trends, admin) stays with main.py.
+"""
+import logging
+import os
+import random
+from datetime import datetime
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+from models.lookup_tables import LookupTables
+from utils.metrics import FALLBACK_PREDICTIONS, PREDICTIONS, metrics
+from utils.responses import FileSnapshot, forecast_payload, parse_forecast_args, traffic_response
+
+app = Flask(__name__)
+CORS(app)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LOOKUP_TABLES = os.environ.get('AI_LOOKUP_TABLES', 'models/lookup_tables.npz')
+
+tables = LookupTables()
+published_predictions_file = FileSnapshot(os.environ.get('AI_PREDICTIONS_SNAPSHOT', 'models/predictions_snapshot.json'))
+
+def load_tables():
+    """Load the exported tables; with gunicorn's preload_app this runs once in the master"""
+    global tables
+    tables = LookupTables.load(LOOKUP_TABLES)
+    if not tables.has_traffic:
+        logger.warning(f"No lookup tables at {LOOKUP_TABLES}, run app/train.py to export them")
+
+@app.route('/')
+def home():
+    return jsonify({
+        "message": "Smart City AI Service (lookup-only)",
+        "status": "operational",
+        "endpoints": {
+            "traffic_prediction": "/predict/traffic?location=<location>",
+            "traffic_forecast": "/forecast/traffic?locations=<a,b>&hours=<n>&weather=<w>",
+            "published_predictions": "/predictions/published",
+            "health": "/health",
+            "metrics": "/metrics"
+        }
+    })
+
+@app.route('/predict/traffic')
+def predict_traffic():
+    location = request.args.get('location', 'Central Square')
+    if not tables.has_traffic:
+        return jsonify({"error": "Lookup tables not loaded"}), 503
+
+    now = datetime.now()
+    PREDICTIONS.inc(model='traffic')
+    congestion = tables.predict_traffic(location, now.hour, now.weekday())
+    if congestion is None:
+        # Same mid-range fallback as TrafficPredictor for unknown locations
+        FALLBACK_PREDICTIONS.inc(model='traffic')
+        congestion = random.randint(3, 7)
+    return jsonify(traffic_response(location, congestion, now))
+
+@app.route('/forecast/traffic')
+def forecast_traffic():
+    try:
+        locations, hours, weather = parse_forecast_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not tables.has_forecast:
+        return jsonify({"error": "Lookup tables not loaded"}), 503
+
+    payload = forecast_payload(tables, locations, hours, weather, datetime.now())
+    PREDICTIONS.inc(len(payload["forecast"]) * hours, model='advanced')
+    return jsonify(payload)
+
+@app.route('/predictions/published')
+def published_predictions():
+    snapshot = published_predictions_file.read()
+    if snapshot is None:
+        return jsonify({"error": "No published predictions yet"}), 404
+
+    body, mtime = snapshot
+    response = Response(body, mimetype='application/json')
+    response.set_etag(str(mtime))
+    return response.make_conditional(request)
+
+@app.route('/health')
+def health():
+    models = {"traffic": tables.has_traffic, "advanced_traffic": tables.has_forecast}
+    return jsonify({
+        "status": "healthy",
+        "service": "ai-service",
+        "mode": "lookup",
+        "timestamp": datetime.now().isoformat(),
+        "models_loaded": all(models.values()),
+        "models": models,
+        "versions": {"traffic": tables.traffic_version, "advanced_traffic": tables.advanced_version}
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+load_tables()
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
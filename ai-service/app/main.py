@@ -1,14 +1,29 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-import joblib
+from functools import wraps
+import hashlib
+import hmac
+import json
+import os
 import random
+import threading
+import time
 from datetime import datetime, timedelta
 import logging
 
+from models.anomaly_detector import AnomalyDetector
+from models.flat_forest import INFERENCE_BACKEND
+from models.traffic_predictor import DAYS_PER_WEEK, HOURS_PER_DAY, AdvancedTrafficModel, TrafficPredictor
+from services.data_processor import DataProcessor
+from services.db_loader import ConnectionPool
+from services.geo_index import GeoIndex, interpolate
+from services.model_registry import ModelNotFound, ModelRegistry
+from services.model_reloader import ModelReloader, ReloadInProgress
+from services.trend_engine import TrendEngine
+from utils.cache import TTLCache, hour_bucket, next_hour
+from utils.metrics import metrics, observe_stage
+from utils.responses import FileSnapshot, forecast_grid, forecast_payload, parse_forecast_args, traffic_response
+
 app = Flask(__name__)
 CORS(app)
 
@@ -19,143 +34,219 @@ logger = logging.getLogger(__name__)
 traffic_model = None
 trend_model = None
 
-class TrafficPredictor:
-    def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.location_encoder = LabelEncoder()
-        self.is_trained = False
-        
-    def train_model(self):
-        """Train a simple traffic prediction model with mock data"""
-        try:
-            # Generate mock training data
-            np.random.seed(42)
-            locations = ['Main St & 1st Ave', 'Central Square', 'Highway I-95', 'Bridge Entrance', 'Tunnel Exit']
-            n_samples = 1000
-            
-            data = []
-            for _ in range(n_samples):
-                location = random.choice(locations)
-                hour = random.randint(0, 23)
-                day_of_week = random.randint(0, 6)
-                is_weekend = 1 if day_of_week >= 5 else 0
-                
-                # Base congestion based on location and time
-                base_congestion = {
-                    'Main St & 1st Ave': 5 + 2 * np.sin(hour * np.pi / 12),
-                    'Central Square': 4 + 3 * np.sin(hour * np.pi / 12),
-                    'Highway I-95': 3 + 4 * np.sin((hour - 7) * np.pi / 12),
-                    'Bridge Entrance': 6 + 3 * np.sin((hour - 8) * np.pi / 12),
-                    'Tunnel Exit': 7 + 2 * np.sin((hour - 17) * np.pi / 12)
-                }
-                
-                congestion = max(1, min(10, base_congestion[location] + random.gauss(0, 1)))
-                
-                data.append({
-                    'location': location,
-                    'hour': hour,
-                    'day_of_week': day_of_week,
-                    'is_weekend': is_weekend,
-                    'congestion': congestion
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Encode locations
-            locations_encoded = self.location_encoder.fit_transform(df['location'])
-            
-            # Prepare features
-            X = np.column_stack([
-                locations_encoded,
-                df['hour'],
-                df['day_of_week'],
-                df['is_weekend']
-            ])
-            y = df['congestion']
-            
-            # Train model
-            self.model.fit(X, y)
-            self.is_trained = True
-            logger.info("Traffic prediction model trained successfully")
-            
-        except Exception as e:
-            logger.error(f"Error training traffic model: {str(e)}")
-            self.is_trained = False
+# Upper bound on the number of queries accepted by a single batch request
+MAX_BATCH_SIZE = 5000
+
+# Micro-batching of streamed sensor readings: size cap and maximum wait in seconds
+ANOMALY_BATCH_SIZE = int(os.environ.get('AI_ANOMALY_BATCH_SIZE', 256))
+ANOMALY_MAX_DELAY = float(os.environ.get('AI_ANOMALY_MAX_DELAY', 0.5))
+
+# Largest radius, in meters, accepted by /predict/traffic/nearby
+MAX_NEARBY_RADIUS = 50000
+
+# Neighbouring locations interpolated for a point prediction
+NEARBY_NEIGHBOURS = 3
+
+# Shared secret /admin endpoints expect in the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.environ.get('AI_ADMIN_TOKEN')
+
+# Seconds between checks for changed model artifacts, 0 disables the watcher
+MODEL_WATCH_INTERVAL = float(os.environ.get('AI_MODEL_WATCH_INTERVAL', 30))
+
+# Snapshot file written by app/publish.py
+PREDICTIONS_SNAPSHOT = os.environ.get('AI_PREDICTIONS_SNAPSHOT', 'models/predictions_snapshot.json')
+
+# Seconds between trend engine polls of the operations tables, when AI_DB_URL is set
+TREND_POLL_INTERVAL = float(os.environ.get('AI_TREND_POLL_INTERVAL', 30))
+
+# Initialize models
+traffic_predictor = TrafficPredictor()
+trend_engine = TrendEngine()
+advanced_traffic_model = AdvancedTrafficModel()
+anomaly_detector = AnomalyDetector()
+data_processor = DataProcessor()
+
+# Coordinates of the locations the traffic model knows, filled by load_models()
+geo_index = GeoIndex({})
+
+# Versioned per-district models, loaded on first request that pins one
+model_registry = ModelRegistry(os.environ.get('AI_MODEL_REGISTRY', 'models/registry'))
+
+REQUESTS = metrics.counter(
+    'ai_http_requests_total', 'HTTP requests by endpoint, method and status', ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = metrics.histogram(
+    'ai_http_request_duration_seconds', 'HTTP request latency by endpoint', ('endpoint',))
+# A model counts as loaded once every live worker that reported it has it
+MODELS_LOADED = metrics.gauge(
+    'ai_model_loaded', 'Whether a model is loaded and serving (1) or not (0)', ('model',), multiprocess_mode='livemin')
+
+# Hourly cache of serialized responses, predictions only change on the hour
+response_cache = TTLCache(max_size=int(os.environ.get('AI_RESPONSE_CACHE_SIZE', 4096)), name='response')
+
+# Serializes model updates; readers never take it
+_model_update_lock = threading.Lock()
+
+def _purge_responses(*kinds):
+    """Drop cached responses built by a replaced model; keys start with the endpoint kind"""
+    response_cache.discard(lambda key: key[0][0] in kinds)
+
+def swap_traffic_predictor(predictor):
+    """Atomically replace the predictor used by new requests, in-flight ones finish on the old one"""
+    global traffic_predictor
+    previous = traffic_predictor
+    traffic_predictor = predictor
+    # Registered versions may have been added along with the new artifact
+    model_registry.invalidate('traffic')
+    _purge_responses('traffic')
+    if set(predictor.location_index) != set(previous.location_index):
+        load_geo_index()
+
+def swap_advanced_traffic_model(model):
+    global advanced_traffic_model
+    advanced_traffic_model = model
+    model_registry.invalidate('advanced')
+    _purge_responses('forecast')
+
+def swap_anomaly_detector(detector):
+    global anomaly_detector
+    anomaly_detector = detector
+    model_registry.invalidate('anomaly')
+
+# Hot reload of the serving models when their artifacts change
+model_reloader = ModelReloader(_model_update_lock)
+
+def resolve_model(name, default, version=None, district=None):
+    """Registered model pinned by version and/or district, else the serving default.
     
-    def predict(self, location, hour=None, day_of_week=None):
-        """Predict traffic congestion for a location"""
-        try:
-            if not self.is_trained:
-                self.train_model()
-            
-            if hour is None:
-                hour = datetime.now().hour
-            if day_of_week is None:
-                day_of_week = datetime.now().weekday()
-            
-            is_weekend = 1 if day_of_week >= 5 else 0
-            
-            # Encode location
-            if location not in self.location_encoder.classes_:
-                # If unknown location, use average
-                return random.randint(3, 7)
-            
-            location_encoded = self.location_encoder.transform([location])[0]
-            
-            # Prepare features
-            X = np.array([[location_encoded, hour, day_of_week, is_weekend]])
-            
-            prediction = self.model.predict(X)[0]
-            return max(1, min(10, round(prediction)))
-            
-        except Exception as e:
-            logger.error(f"Error predicting traffic: {str(e)}")
-            # Fallback prediction
-            return random.randint(3, 7)
+    Returns (model, cache key suffix); pinned responses are cached apart from default ones.
+    """
+    if version is None and district is None:
+        return default, ()
+    
+    model = model_registry.get(name, version, district)
+    return model, (district, model.version)
+
+def requested_model(name, default):
+    """resolve_model for the model_version and district query parameters"""
+    return resolve_model(name, default, request.args.get('model_version'), request.args.get('district'))
+
+@app.errorhandler(ModelNotFound)
+def model_not_found(e):
+    return jsonify({"error": f"Unknown model version {e.args[0]}"}), 404
+
+def admin_only(view):
+    """Reject requests without the AI_ADMIN_TOKEN shared secret in X-Admin-Token"""
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({"error": "Admin endpoints are disabled, set AI_ADMIN_TOKEN to enable them"}), 403
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            return jsonify({"error": "Missing or invalid X-Admin-Token"}), 401
+        return view(*args, **kwargs)
+    return guarded
+
+def cached_payload(key, now, build, cacheable=True):
+    """Serialized build() payload and its ETag, kept in the response cache until the next hour.
+    
+    Payloads that are not cacheable are rebuilt every time and get no ETag.
+    """
+    if not cacheable:
+        payload = build()
+        with observe_stage(key[0], 'serialize'):
+            return app.json.dumps(payload), None
+    
+    cache_key = (key, hour_bucket(now))
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        payload = build()
+        with observe_stage(key[0], 'serialize'):
+            body = app.json.dumps(payload)
+        cached = (body, hashlib.sha1(body.encode()).hexdigest())
+        response_cache.set(cache_key, cached, next_hour(now).timestamp())
+    
+    return cached
+
+def cached_json_response(key, now, build, cacheable=True):
+    """Serve build()'s payload from the response cache until the next hour boundary.
+    
+    Responses carry an ETag and a Cache-Control max-age ending at the same boundary
+    so nginx and clients can cache them too; conditional requests get a 304.
+    Responses that are not cacheable are sent with Cache-Control: no-store.
+    """
+    body, etag = cached_payload(key, now, build, cacheable)
+    response = Response(body, mimetype='application/json')
+    if etag is None:
+        response.cache_control.no_store = True
+        return response
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max(0, int((next_hour(now) - now).total_seconds()))
+    return response.make_conditional(request)
+
+def traffic_cacheable(predictor, location):
+    """Whether /predict/traffic for location is a model prediction, not a random fallback"""
+    return predictor.is_trained and location in predictor.location_index
+
+def traffic_prediction(predictor, location, now):
+    """Payload of /predict/traffic for the current hour"""
+    with observe_stage('traffic', 'inference'):
+        congestion = predictor.predict(location, now.hour, now.weekday())
+    return traffic_response(location, congestion, now)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+# Background thread name -> pid of the process that started it
+_background = {}
+_background_lock = threading.Lock()
 
-class TrendAnalyzer:
-    def __init__(self):
-        self.operation_types = ['TRAFFIC', 'SECURITY', 'UTILITY', 'EMERGENCY']
+def start_background(name, target, *args):
+    """Start target(*args) in a daemon thread once per process.
     
-    def analyze_trends(self, operations_data=None):
-        """Analyze trends in city operations"""
+    Threads do not survive gunicorn's fork after preload_app, so workers start
+    theirs on their first request rather than at import.
+    """
+    if _background.get(name) == os.getpid():
+        return
+    with _background_lock:
+        if _background.get(name) != os.getpid():
+            _background[name] = os.getpid()
+            threading.Thread(target=target, args=args, daemon=True, name=name).start()
+
+def poll_trends(url):
+    pool = ConnectionPool(url, size=1)
+    while True:
         try:
-            # Mock trend analysis
-            trends = {
-                "overall_trend": "stable",
-                "alerts": [
-                    {
-                        "type": "TRAFFIC",
-                        "level": "warning",
-                        "message": "Increased congestion expected during evening rush hour"
-                    },
-                    {
-                        "type": "SECURITY", 
-                        "level": "info",
-                        "message": "All security systems operational"
-                    }
-                ],
-                "recommendations": [
-                    "Deploy additional traffic control units to downtown area",
-                    "Schedule utility maintenance during off-peak hours",
-                    "Monitor weather conditions for potential emergency response needs"
-                ],
-                "metrics": {
-                    "total_incidents_today": random.randint(15, 25),
-                    "average_response_time": f"{random.randint(5, 15)} minutes",
-                    "system_efficiency": f"{random.randint(85, 95)}%"
-                }
-            }
-            
-            return trends
-            
+            trend_engine.poll(pool)
         except Exception as e:
-            logger.error(f"Error analyzing trends: {str(e)}")
-            return {"error": "Trend analysis temporarily unavailable"}
+            logger.error(f"Error polling trend events: {str(e)}")
+        time.sleep(TREND_POLL_INTERVAL)
 
-# Initialize models
-traffic_predictor = TrafficPredictor()
-trend_analyzer = TrendAnalyzer()
+@app.before_request
+def start_background_threads():
+    url = os.environ.get('AI_DB_URL')
+    if url:
+        start_background('trend-poller', poll_trends, url)
+    if MODEL_WATCH_INTERVAL > 0:
+        start_background('model-watcher', model_reloader.watch, MODEL_WATCH_INTERVAL)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    if 'request_started' in g:
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
+def models_status():
+    """Per-model loaded flags for /health and /metrics"""
+    return {
+        "traffic": traffic_predictor.is_trained,
+        "advanced_traffic": advanced_traffic_model.is_trained,
+        "anomaly": anomaly_detector.is_trained
+    }
 
 @app.route('/')
 def home():
@@ -163,46 +254,37 @@ def home():
         "message": "Smart City AI Service",
         "status": "operational",
         "endpoints": {
-            "traffic_prediction": "/predict/traffic?location=<location>",
+            "traffic_prediction": "/predict/traffic?location=<location>&district=<d>&model_version=<v>",
+            "traffic_batch_prediction": "POST /predict/traffic/batch",
+            "traffic_nearby": "/predict/traffic/nearby?lat=<lat>&lon=<lon>&radius=<meters>",
+            "traffic_forecast": "/forecast/traffic?locations=<a,b>&hours=<n>&weather=<w>&stream=<0|1>",
             "trend_analysis": "/analyze/trends",
-            "health": "/health"
+            "trend_events": "POST /analyze/trends/events (single worker only)",
+            "anomaly_stream": "POST /detect/anomalies/stream (NDJSON)",
+            "published_predictions": "/predictions/published",
+            "models": "/models",
+            "model_update": "POST /admin/models/traffic/update (X-Admin-Token)",
+            "model_reload": "POST /admin/models/<traffic|advanced|anomaly>/reload (X-Admin-Token)",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     })
 
 @app.route('/predict/traffic')
 def predict_traffic():
     location = request.args.get('location', 'Central Square')
+    predictor, pinned = requested_model('traffic', traffic_predictor)
     
     try:
         # Get current time for prediction
         now = datetime.now()
-        hour = now.hour
-        day_of_week = now.weekday()
-        
-        # Predict congestion
-        congestion = traffic_predictor.predict(location, hour, day_of_week)
-        
-        # Generate prediction message based on congestion level
-        if congestion <= 3:
-            status = "Light"
-            message = f"Light traffic expected at {location}"
-        elif congestion <= 6:
-            status = "Moderate" 
-            message = f"Moderate traffic expected at {location}"
-        else:
-            status = "Heavy"
-            message = f"Heavy traffic expected at {location}"
         
-        response = {
-            "location": location,
-            "predicted_congestion": congestion,
-            "status": status,
-            "message": message,
-            "timestamp": now.isoformat(),
-            "confidence": round(random.uniform(0.7, 0.95), 2)
-        }
-        
-        return jsonify(response)
+        # Fallback predictions are not worth keeping for an hour
+        return cached_json_response(
+            ('traffic', location) + pinned, now,
+            lambda: traffic_prediction(predictor, location, now),
+            cacheable=traffic_cacheable(predictor, location)
+        )
         
     except Exception as e:
         logger.error(f"Error in traffic prediction: {str(e)}")
@@ -211,25 +293,351 @@ def predict_traffic():
             "fallback_prediction": "Moderate traffic expected"
         }), 500
 
+def _optional_int(item, field, upper):
+    """item[field] as an int in [0, upper), None when absent; ValueError otherwise"""
+    value = item.get(field)
+    if value is None:
+        return None
+    # bool is an int subclass, but true/false is not an hour or a day
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value < upper:
+        raise ValueError(f"{field} must be an integer between 0 and {upper - 1}")
+    return value
+
+def parse_batch_queries(payload):
+    """(location, hour, day_of_week) tuples from a batch request body, ValueError when invalid"""
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    
+    if 'queries' in payload:
+        items = payload['queries']
+    else:
+        locations = payload.get('locations', [])
+        if not isinstance(locations, list):
+            raise ValueError("'locations' must be a list of location names")
+        items = [{'location': location} for location in locations]
+    
+    if not isinstance(items, list) or not items:
+        raise ValueError("Request body must contain a non-empty 'queries' or 'locations' list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size exceeds limit of {MAX_BATCH_SIZE}")
+    
+    queries = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Each query must be an object")
+        location = item.get('location', 'Central Square')
+        if not isinstance(location, str):
+            raise ValueError("location must be a string")
+        queries.append((location, _optional_int(item, 'hour', HOURS_PER_DAY),
+                        _optional_int(item, 'day_of_week', DAYS_PER_WEEK)))
+    return queries
+
+@app.route('/predict/traffic/batch', methods=['POST'])
+def predict_traffic_batch():
+    """Predict congestion for many locations and (hour, day_of_week) pairs at once"""
+    try:
+        queries = parse_batch_queries(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    predictor, _ = requested_model('traffic', traffic_predictor)
+    
+    try:
+        now = datetime.now()
+        congestions = predictor.predict_batch(queries)
+        
+        predictions = []
+        for (location, hour, day_of_week), congestion in zip(queries, congestions):
+            prediction = traffic_response(location, congestion, now)
+            prediction["hour"] = now.hour if hour is None else hour
+            prediction["day_of_week"] = now.weekday() if day_of_week is None else day_of_week
+            predictions.append(prediction)
+        
+        return jsonify({
+            "predictions": predictions,
+            "total": len(predictions),
+            "timestamp": now.isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in batch traffic prediction: {str(e)}")
+        return jsonify({
+            "error": "Prediction service temporarily unavailable"
+        }), 500
+
+@app.route('/predict/traffic/nearby')
+def predict_traffic_nearby():
+    """Congestion at a point, interpolated from the nearest locations, and at every location within a radius"""
+    try:
+        latitude = float(request.args['lat'])
+        longitude = float(request.args['lon'])
+        radius = float(request.args.get('radius', 1000))
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat and lon are required and, with radius, must be numbers"}), 400
+    if not 0 <= radius <= MAX_NEARBY_RADIUS:
+        return jsonify({"error": f"radius must be between 0 and {MAX_NEARBY_RADIUS} meters"}), 400
+    
+    index, predictor = geo_index, traffic_predictor
+    try:
+        neighbours = index.nearest(latitude, longitude, NEARBY_NEIGHBOURS)
+        segments = index.within(latitude, longitude, radius)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not neighbours:
+        return jsonify({"error": "No located traffic locations are known"}), 503
+    
+    try:
+        now = datetime.now()
+        # One batched prediction for the neighbours and the segments together
+        names = list(dict.fromkeys(name for name, _ in neighbours + segments))
+        congestion = dict(zip(names, predictor.predict_batch([(name, None, None) for name in names])))
+        
+        point = interpolate([congestion[name] for name, _ in neighbours], [d for _, d in neighbours])
+        return jsonify({
+            "latitude": latitude,
+            "longitude": longitude,
+            "predicted_congestion": round(point, 1),
+            "nearest": {"location": neighbours[0][0], "distance_m": round(neighbours[0][1], 1)},
+            "radius_m": radius,
+            "segments": [
+                {
+                    "location": name,
+                    "latitude": index.coordinates_of(name)[0],
+                    "longitude": index.coordinates_of(name)[1],
+                    "distance_m": round(distance, 1),
+                    "predicted_congestion": congestion[name]
+                }
+                for name, distance in segments
+            ],
+            "timestamp": now.isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in nearby traffic prediction: {str(e)}")
+        return jsonify({
+            "error": "Prediction service temporarily unavailable"
+        }), 500
+
+@app.route('/forecast/traffic')
+def forecast_traffic():
+    """Congestion curves for many locations over the next hours, from one inference pass"""
+    try:
+        locations, hours, weather = parse_forecast_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    model, pinned = requested_model('advanced', advanced_traffic_model)
+    now = datetime.now()
+    
+    try:
+        if request.args.get('stream') == '1':
+            header, known, congestion = forecast_grid(model, locations, hours, weather, now)
+            
+            def generate():
+                yield json.dumps(header) + "\n"
+                for location, row in zip(known, congestion):
+                    yield json.dumps({"location": location, "congestion": row.tolist()}) + "\n"
+            
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        key = ('forecast', tuple(locations or ()), hours, weather) + pinned
+        return cached_json_response(
+            key, now,
+            lambda: forecast_payload(model, locations, hours, weather, now),
+            cacheable=model.is_trained
+        )
+        
+    except Exception as e:
+        logger.error(f"Error in traffic forecast: {str(e)}")
+        return jsonify({
+            "error": "Forecast service temporarily unavailable"
+        }), 500
+
+@app.route('/admin/models/traffic/update', methods=['POST'])
+@admin_only
+def update_traffic_model():
+    """Fold newly arrived traffic_data rows into the serving model without a full refit.
+    
+    The updated model is always saved: the other workers' model watchers
+    reload the artifact, so every worker converges on the same model.
+    """
+    payload = request.get_json(silent=True) or {}
+    rows = payload.get('observations')
+    
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Request body must contain a non-empty 'observations' list"}), 400
+    
+    try:
+        observations = data_processor.process_traffic_data(
+            {**row, 'vehicle_count': row.get('vehicle_count', 0)} for row in rows
+        )
+    except Exception as e:
+        return jsonify({"error": f"Invalid observations: {str(e)}"}), 400
+    
+    try:
+        with _model_update_lock:
+            try:
+                updated = traffic_predictor.incremental_update(observations)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if updated is None:
+                return jsonify({"error": "No observations for known locations"}), 400
+            
+            updated.save_model()
+            swap_traffic_predictor(updated)
+            # This process already serves the saved artifact, its watcher need not reload it
+            model_reloader.mark_current('traffic')
+        
+        return jsonify({
+            "status": "updated",
+            "version": updated.version,
+            "observations": len(observations),
+            "n_estimators": len(updated.model.estimators_)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error updating traffic model: {str(e)}")
+        return jsonify({
+            "error": "Model update failed"
+        }), 500
+
+@app.route('/admin/models/<name>/reload', methods=['POST'])
+@admin_only
+def reload_model(name):
+    """Load the model's artifact off the serving path and swap it in once its canary check passes"""
+    if name not in model_reloader.slots:
+        return jsonify({"error": f"Unknown model {name}"}), 404
+    
+    try:
+        result = model_reloader.reload(name)
+    except ReloadInProgress:
+        return jsonify({"error": "A reload is already in progress"}), 409
+    except Exception as e:
+        logger.error(f"Error reloading {name} model: {str(e)}")
+        return jsonify({"error": "Model reload failed"}), 500
+    
+    return jsonify(result), 200 if result['status'] == 'reloaded' else 422
+
 @app.route('/analyze/trends')
 def analyze_trends():
     try:
-        trends = trend_analyzer.analyze_trends()
-        return jsonify(trends)
+        # Reads running aggregates, so there is nothing worth caching
+        return jsonify(trend_engine.snapshot())
     except Exception as e:
         logger.error(f"Error in trend analysis: {str(e)}")
         return jsonify({
             "error": "Trend analysis service temporarily unavailable"
         }), 500
 
+@app.route('/analyze/trends/events', methods=['POST'])
+def record_trend_events():
+    """Push city_operations, emergency_incidents and system_metrics rows into the trend engine.
+
+    Single-worker deployments only (tests, a local `python app/main.py`):
+    aggregates are per process and a push reaches one worker. Behind gunicorn,
+    set AI_DB_URL so every worker polls the tables itself, as docker-compose does.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    for field in ('operations', 'incidents', 'metrics'):
+        rows = payload.get(field, [])
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return jsonify({"error": f"'{field}' must be a list of objects"}), 400
+    
+    try:
+        applied = trend_engine.ingest(
+            operations=payload.get('operations', []),
+            incidents=payload.get('incidents', []),
+            metrics=payload.get('metrics', [])
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid events: {str(e)}"}), 400
+    return jsonify({"applied": applied})
+
+@app.route('/detect/anomalies/stream', methods=['POST'])
+def detect_anomalies_stream():
+    """Score an NDJSON stream of iot_devices readings and stream back the anomalous ones"""
+    detector = anomaly_detector
+    if not detector.is_trained:
+        return jsonify({"error": "Anomaly detector not loaded"}), 503
+    
+    stats = {"received": 0, "rejected": 0, "anomalies": 0}
+    # Read by detect_stream's reader thread, which has no request context of its own
+    stream = request.stream
+    
+    def readings():
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            stats["received"] += 1
+            try:
+                reading = json.loads(line)
+                for feature in detector.features:
+                    float(reading[feature])
+            except (ValueError, TypeError, KeyError):
+                stats["rejected"] += 1
+                continue
+            yield reading
+    
+    def generate():
+        for reading, score in detector.detect_stream(readings(), ANOMALY_BATCH_SIZE, ANOMALY_MAX_DELAY):
+            stats["anomalies"] += 1
+            yield json.dumps({**reading, "anomaly_score": round(score, 4)}) + "\n"
+        yield json.dumps({"summary": stats}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+published_predictions_file = FileSnapshot(PREDICTIONS_SNAPSHOT)
+
+@app.route('/predictions/published')
+def published_predictions():
+    """Predictions precomputed by app/publish.py, read from its snapshot file without touching a model"""
+    snapshot = published_predictions_file.read()
+    if snapshot is None:
+        return jsonify({"error": "No published predictions yet"}), 404
+    
+    body, mtime = snapshot
+    response = Response(body, mimetype='application/json')
+    response.set_etag(str(mtime))
+    return response.make_conditional(request)
+
+@app.route('/models')
+def list_models():
+    """Registered models per district with their versions, and what this worker has loaded"""
+    registered = {
+        name: {district: model_registry.versions(name, district) for district in model_registry.districts(name)}
+        for name in model_registry.names()
+    }
+    
+    return jsonify({
+        "registered": registered,
+        "registry": model_registry.stats()
+    })
+
 @app.route('/health')
 def health_check():
-    return jsonify({
+    return jsonify(health_payload())
+
+def health_payload():
+    models = models_status()
+    return {
         "status": "healthy",
         "service": "ai-service",
         "timestamp": datetime.now().isoformat(),
-        "models_loaded": True
-    })
+        "models_loaded": all(models.values()),
+        "models": models,
+        "inference_backend": INFERENCE_BACKEND
+    }
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of the metrics, of every worker under gunicorn"""
+    for model, loaded in models_status().items():
+        MODELS_LOADED.set(int(loaded), model=model)
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/simulate/emergency')
 def simulate_emergency():
@@ -264,8 +672,47 @@ def simulate_emergency():
         "timestamp": datetime.now().isoformat()
     })
 
+def load_models():
+    """Load persisted model artifacts, training only when none exist yet"""
+    if not traffic_predictor.load_model():
+        logger.warning("No traffic model artifact found, training one now (run app/train.py offline instead)")
+        traffic_predictor.train_model()
+        traffic_predictor.save_model()
+    
+    if not advanced_traffic_model.load_model():
+        logger.warning("No advanced traffic model artifact found, training one now (run app/train.py offline instead)")
+        advanced_traffic_model.train()
+    
+    if not anomaly_detector.load_model():
+        logger.warning("No anomaly detector artifact found, training one now (run app/train.py offline instead)")
+        anomaly_detector.train()
+    
+    load_geo_index()
+    
+    model_reloader.register('traffic', TrafficPredictor, lambda: traffic_predictor, swap_traffic_predictor)
+    model_reloader.register('advanced', AdvancedTrafficModel, lambda: advanced_traffic_model, swap_advanced_traffic_model)
+    model_reloader.register('anomaly', AnomalyDetector, lambda: anomaly_detector, swap_anomaly_detector)
+
+def load_geo_index():
+    """Index the coordinates of the traffic model's locations, from AI_LOCATION_COORDINATES and AI_DB_URL"""
+    global geo_index
+    url = os.environ.get('AI_DB_URL')
+    pool = ConnectionPool(url, size=1) if url else None
+    try:
+        geo_index = GeoIndex.load(
+            path=os.environ.get('AI_LOCATION_COORDINATES', 'models/location_coordinates.json'),
+            pool=pool,
+            known=traffic_predictor.location_index
+        )
+    except Exception as e:
+        logger.error(f"Error loading location coordinates: {str(e)}")
+    finally:
+        if pool is not None:
+            pool.close()
+    logger.info(f"Geo index covers {len(geo_index)} locations")
+
 if __name__ == '__main__':
-    # Train models on startup
-    traffic_predictor.train_model()
+    # Load trained models on startup
+    load_models()
     
     app.run(host='0.0.0.0', port=5000, debug=True)
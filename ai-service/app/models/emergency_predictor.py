@@ -3,21 +3,43 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 import joblib
+import os
+import time
+from datetime import datetime
+
+from models.flat_forest import compile_if_enabled, inference_model
+from utils.helpers import dump_artifact
+from utils.metrics import MODEL_LOAD_SECONDS, MODEL_TRAIN_SECONDS
 
 class EmergencyPredictor:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+    def __init__(self, n_jobs=None):
+        self.model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        self.flat_model = None
         self.location_encoder = LabelEncoder()
         self.type_encoder = LabelEncoder()
+        self.location_index = {}
+        self.type_index = {}
+        # Training severe rates, used for categories the forest never saw
+        self.severe_rate = 0.5
+        self.location_rates = {}
+        self.type_rates = {}
+        self.features = ['location', 'type', 'hour', 'day_of_week', 'month']
+        self.model_path = 'models/emergency_predictor.joblib'
+        self.version = None
         self.is_trained = False
-    
+
     def train(self, historical_data):
-        """Train emergency prediction model"""
+        """Train emergency prediction model.
+
+        historical_data is a frame with location, type, severity, hour, day_of_week
+        and month columns, e.g. DataProcessor.process_emergency_columns output.
+        """
+        started = time.perf_counter()
         try:
             # Encode categorical variables
             locations_encoded = self.location_encoder.fit_transform(historical_data['location'])
             types_encoded = self.type_encoder.fit_transform(historical_data['type'])
-            
+
             # Prepare features
             X = np.column_stack([
                 locations_encoded,
@@ -26,34 +48,182 @@ class EmergencyPredictor:
                 historical_data['day_of_week'],
                 historical_data['month']
             ])
-            
+
             y = historical_data['severity'] > 3  # Predict if severe
-            
+
             # Train model
             self.model.fit(X, y)
+            # Training parallelism only, single-request inference stays single-threaded
+            self.model.set_params(n_jobs=None)
+            self.flat_model = compile_if_enabled(self.model)
+            self._index_encoders()
+            self._fit_rates(historical_data['location'], historical_data['type'], y)
+            self.version = datetime.now().strftime('%Y%m%d%H%M%S')
             self.is_trained = True
-            
+            MODEL_TRAIN_SECONDS.set(time.perf_counter() - started, model='emergency')
+
             return True
         except Exception as e:
             print(f"Error training emergency predictor: {str(e)}")
             return False
-    
+
+    def save_model(self):
+        """Persist the trained model, its encoders and fallback rates"""
+        dump_artifact({
+            'version': self.version,
+            'model': self.model,
+            'location_encoder': self.location_encoder,
+            'type_encoder': self.type_encoder,
+            'severe_rate': self.severe_rate,
+            'location_rates': self.location_rates,
+            'type_rates': self.type_rates
+        }, self.model_path)
+
+    def load_model(self):
+        """Memory-map a persisted artifact"""
+        started = time.perf_counter()
+        try:
+            if os.path.exists(self.model_path):
+                loaded = joblib.load(self.model_path, mmap_mode='r')
+                self.model = loaded['model']
+                self.flat_model = compile_if_enabled(self.model)
+                self.location_encoder = loaded['location_encoder']
+                self.type_encoder = loaded['type_encoder']
+                self._index_encoders()
+                self.severe_rate = loaded['severe_rate']
+                self.location_rates = loaded['location_rates']
+                self.type_rates = loaded['type_rates']
+                self.version = loaded['version']
+                self.is_trained = True
+                MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='emergency')
+                return True
+        except Exception as e:
+            print(f"Error loading emergency predictor: {str(e)}")
+
+        return False
+
+    def canary(self, n_rows=512):
+        """Score a sample of known (location, type, time) rows, ValueError unless they are probabilities"""
+        if not self.location_index or not self.type_index:
+            # Nothing for the forest to score, every prediction is a fallback rate
+            rates = np.array([self.severe_rate] + list(self.location_rates.values()) + list(self.type_rates.values()))
+            if not (np.isfinite(rates).all() and ((rates >= 0) & (rates <= 1)).all()):
+                raise ValueError("Fallback severe rate is not a probability")
+            return 0
+
+        rng = np.random.default_rng(0)
+        X = np.column_stack([
+            rng.integers(0, len(self.location_index), n_rows),
+            rng.integers(0, len(self.type_index), n_rows),
+            rng.integers(0, 24, n_rows),
+            rng.integers(0, 7, n_rows),
+            rng.integers(1, 13, n_rows)
+        ])
+        risk = self._severe_probability(X)
+        if not (np.isfinite(risk).all() and ((risk >= 0) & (risk <= 1)).all()):
+            raise ValueError("Severe risk is not a probability")
+        return n_rows
+
+    def _index_encoders(self):
+        """Build hash maps from category to code"""
+        self.location_index = {
+            location: code for code, location in enumerate(self.location_encoder.classes_)
+        }
+        self.type_index = {
+            emergency_type: code for code, emergency_type in enumerate(self.type_encoder.classes_)
+        }
+
+    def _fit_rates(self, locations, types, severe):
+        """Severe rate overall and per location and type, the fallback for unseen categories"""
+        severe = pd.Series(np.asarray(severe, dtype=float))
+        self.severe_rate = float(severe.mean())
+        self.location_rates = severe.groupby(np.asarray(locations, dtype=object)).mean().to_dict()
+        self.type_rates = severe.groupby(np.asarray(types, dtype=object)).mean().to_dict()
+
+    def _fallback(self, location, emergency_type):
+        """Training rate of whichever category is known, the overall rate if neither is"""
+        if location in self.location_index:
+            return self.location_rates.get(location, self.severe_rate)
+        if emergency_type in self.type_index:
+            return self.type_rates.get(emergency_type, self.severe_rate)
+        return self.severe_rate
+
+    def _fallback_rates(self, locations, types):
+        """_fallback over encoded categories, -1 marking unseen ones"""
+        # The trailing overall rate is what code -1 indexes
+        location_rates = np.array([self.location_rates.get(location, self.severe_rate)
+                                   for location in self.location_encoder.classes_] + [self.severe_rate])
+        type_rates = np.array([self.type_rates.get(emergency_type, self.severe_rate)
+                               for emergency_type in self.type_encoder.classes_] + [self.severe_rate])
+        return np.where(locations >= 0, location_rates[locations], type_rates[types])
+
     def predict(self, location, emergency_type, hour, day_of_week, month):
         """Predict emergency severity"""
         try:
             if not self.is_trained:
                 return 0.5  # Default probability
-            
-            # Encode inputs
-            location_encoded = self.location_encoder.transform([location])[0]
-            type_encoded = self.type_encoder.transform([emergency_type])[0]
-            
-            # Prepare features
-            X = np.array([[location_encoded, type_encoded, hour, day_of_week, month]])
-            
-            probability = self.model.predict_proba(X)[0][1]
-            return probability
-            
+
+            # The forest was never trained on unseen categories, fall back to the training rates
+            if location not in self.location_index or emergency_type not in self.type_index:
+                return float(self._fallback(location, emergency_type))
+
+            X = np.array([[
+                self.location_index[location],
+                self.type_index[emergency_type],
+                hour,
+                day_of_week,
+                month
+            ]])
+
+            return float(self._severe_probability(X)[0])
+
         except Exception as e:
             print(f"Error in emergency prediction: {str(e)}")
             return 0.5
+
+    def predict_batch(self, incidents):
+        """Predict severity probabilities for a whole table of incidents in one predict_proba call.
+
+        incidents is a frame with location, type, hour, day_of_week and month columns,
+        e.g. DataProcessor.process_emergency_data output. Returns an array aligned with it.
+        """
+        if not self.is_trained or len(incidents) == 0:
+            return np.full(len(incidents), 0.5)
+
+        locations = self._encode(incidents['location'], self.location_index)
+        types = self._encode(incidents['type'], self.type_index)
+        known = (locations >= 0) & (types >= 0)
+
+        # Rows with a category the forest never saw keep the training rates
+        risks = self._fallback_rates(locations, types)
+        if known.any():
+            X = np.column_stack([
+                locations,
+                types,
+                incidents['hour'],
+                incidents['day_of_week'],
+                incidents['month']
+            ])[known]
+            risks[known] = self._severe_probability(X)
+
+        return risks
+
+    @staticmethod
+    def _encode(values, index):
+        """Vectorized category lookup, -1 for categories missing from index"""
+        values = pd.Series(values)
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Look up each distinct category once; missing values (code -1) hit the trailing -1
+            category_codes = np.array([index.get(c, -1) for c in values.cat.categories] + [-1])
+            return category_codes[values.cat.codes.to_numpy()]
+
+        return np.fromiter((index.get(value, -1) for value in values), dtype=int, count=len(values))
+
+    def _severe_probability(self, X):
+        """Probability of the severe class, zero when training never saw a severe incident"""
+        classes = list(self.model.classes_)
+        if True not in classes:
+            return np.zeros(len(X))
+        forest = inference_model(self.model, self.flat_model, len(X))
+        return forest.predict_proba(X)[:, classes.index(True)]
@@ -0,0 +1,227 @@
+"""Flattened tree-ensemble inference without sklearn's per-call overhead.
+
+Every tree of a fitted forest is exported into one set of contiguous NumPy
+node arrays, numbered breadth-first so the two children of a split are
+adjacent and a step is one subtraction instead of a select. Leaves point
+back at themselves, so all samples walk all trees in lock-step for
+max_depth vectorized steps with no Python per-node work; the NumPy kernels
+release the GIL, so concurrent request threads overlap.
+
+Enable it with AI_INFERENCE_BACKEND=flat. Every compiled forest is checked
+against sklearn on probe inputs and dropped (sklearn keeps serving) on any
+mismatch. The lock-step walk does max_depth x n_trees work per row, so
+batches above AI_FLAT_MAX_ROWS rows stay on sklearn's compiled per-tree loop.
+"""
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKEND = os.environ.get('AI_INFERENCE_BACKEND', 'sklearn')
+FLAT_MAX_ROWS = int(os.environ.get('AI_FLAT_MAX_ROWS', 256))
+
+# Upper bound on samples x trees evaluated at once, keeps temporaries small
+_MAX_CELLS = 1 << 20
+
+def _average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search, as used by IsolationForest"""
+    n_samples = np.asarray(n_samples, dtype=float)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    result[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return result
+
+def _node_depths(tree):
+    """Depth of every node of a fitted sklearn tree"""
+    depths = np.zeros(tree.node_count, dtype=np.int64)
+    for node in range(tree.node_count):
+        for child in (tree.children_left[node], tree.children_right[node]):
+            if child != -1:
+                depths[child] = depths[node] + 1
+    return depths
+
+def _breadth_first_order(tree):
+    """Node ids of a fitted sklearn tree in breadth-first order, children of a split adjacent"""
+    order = [0]
+    for node in order:
+        if tree.children_left[node] != -1:
+            order.extend((tree.children_left[node], tree.children_right[node]))
+    return np.array(order, dtype=np.int64)
+
+class FlatForest:
+    def __init__(self, kind, feature, threshold, left, right, leaf_value, roots, max_depth,
+                 classes=None, offset=0.0, denominator=1.0):
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.offset = offset
+        self.denominator = denominator
+
+    @classmethod
+    def from_sklearn(cls, estimator):
+        """Export a fitted RandomForestRegressor, RandomForestClassifier or IsolationForest"""
+        name = type(estimator).__name__
+        if name == 'IsolationForest':
+            kind = 'isolation'
+            feature_maps = estimator.estimators_features_
+        elif hasattr(estimator, 'classes_'):
+            kind = 'classifier'
+            feature_maps = [None] * len(estimator.estimators_)
+        else:
+            kind = 'regressor'
+            feature_maps = [None] * len(estimator.estimators_)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for tree_estimator, feature_map in zip(estimator.estimators_, feature_maps):
+            tree = tree_estimator.tree_
+            order = _breadth_first_order(tree)
+            renumber = np.empty(tree.node_count, dtype=np.int64)
+            renumber[order] = np.arange(tree.node_count)
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left[order] == -1
+            depths = _node_depths(tree)[order]
+
+            feature = np.where(is_leaf, 0, tree.feature[order]).astype(np.int64)
+            if feature_map is not None:
+                # Trees fitted on a feature subset index into that subset
+                feature = np.asarray(feature_map)[feature]
+
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, -np.inf, tree.threshold[order]))
+            lefts.append(np.where(is_leaf, nodes, renumber[tree.children_left[order]]) + offset)
+            rights.append(np.where(is_leaf, nodes, renumber[tree.children_right[order]]) + offset)
+
+            if kind == 'regressor':
+                values.append(tree.value[order, 0, 0])
+            elif kind == 'classifier':
+                counts = tree.value[order, 0, :]
+                values.append(counts / counts.sum(axis=1, keepdims=True))
+            else:
+                # Path length through this node plus the expected remainder below it
+                values.append(depths + _average_path_length(tree.n_node_samples[order]))
+
+            roots.append(offset)
+            max_depth = max(max_depth, int(depths.max()))
+            offset += tree.node_count
+
+        forest = cls(
+            kind,
+            np.ascontiguousarray(np.concatenate(features)),
+            np.ascontiguousarray(np.concatenate(thresholds)),
+            np.ascontiguousarray(np.concatenate(lefts)),
+            np.ascontiguousarray(np.concatenate(rights)),
+            np.ascontiguousarray(np.concatenate(values)),
+            np.array(roots, dtype=np.int64),
+            max_depth,
+            classes=getattr(estimator, 'classes_', None) if kind == 'classifier' else None
+        )
+
+        if kind == 'isolation':
+            forest.offset = estimator.offset_
+            forest.denominator = len(estimator.estimators_) * _average_path_length([estimator.max_samples_])[0]
+
+        return forest
+
+    def _leaves(self, X):
+        """Leaf index reached by every sample in every tree, shape (n_samples, n_trees).
+
+        A split's left child is right - 1 and a leaf's right is itself with a
+        -inf threshold, so subtracting the comparison takes one step down.
+        """
+        nodes = self.roots
+        if len(X) == 1:
+            # Single request rows skip the row index broadcast, the hot serving path
+            x = X[0]
+            for _ in range(self.max_depth):
+                nodes = self.right[nodes] - (x[self.feature[nodes]] <= self.threshold[nodes])
+            return nodes[None, :]
+
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(nodes, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            nodes = self.right[nodes] - (X[rows, self.feature[nodes]] <= self.threshold[nodes])
+        return nodes
+
+    def _leaf_mean(self, X):
+        # Same float32 cast as sklearn, so threshold comparisons match exactly; widened
+        # once to the float64 thresholds so the per-step comparisons need no conversion
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        chunk = max(1, _MAX_CELLS // len(self.roots))
+        if len(X) <= chunk:
+            return self.leaf_value[self._leaves(X)].mean(axis=1)
+        return np.concatenate([
+            self.leaf_value[self._leaves(X[start:start + chunk])].mean(axis=1)
+            for start in range(0, len(X), chunk)
+        ])
+
+    def predict(self, X):
+        if self.kind == 'regressor':
+            return self._leaf_mean(X)
+        if self.kind == 'classifier':
+            return self.classes_[np.argmax(self._leaf_mean(X), axis=1)]
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+    def predict_proba(self, X):
+        return self._leaf_mean(X)
+
+    def score_samples(self, X):
+        mean_depth = self._leaf_mean(X)
+        return -(2.0 ** (-mean_depth * len(self.roots) / self.denominator))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset
+
+    def probe_inputs(self, n_samples=512, random_state=0):
+        """Random inputs spanning every split threshold, used to validate the export"""
+        rng = np.random.default_rng(random_state)
+        n_features = int(self.feature.max()) + 1
+        X = np.empty((n_samples, n_features))
+        for f in range(n_features):
+            split_values = self.threshold[(self.feature == f) & np.isfinite(self.threshold)]
+            low, high = (split_values.min(), split_values.max()) if len(split_values) else (0.0, 1.0)
+            margin = max(1.0, (high - low) * 0.1)
+            X[:, f] = rng.uniform(low - margin, high + margin, n_samples)
+        return X
+
+    def matches(self, estimator, X=None):
+        """Whether this export reproduces the sklearn estimator on X (probe inputs by default)"""
+        X = self.probe_inputs() if X is None else X
+        if self.kind == 'regressor':
+            return np.allclose(self.predict(X), estimator.predict(X))
+        if self.kind == 'classifier':
+            return np.allclose(self.predict_proba(X), estimator.predict_proba(X))
+        return np.allclose(self.decision_function(X), estimator.decision_function(X))
+
+def compile_if_enabled(estimator):
+    """FlatForest for estimator when the flat backend is enabled and validates, else None"""
+    if INFERENCE_BACKEND != 'flat' or estimator is None or not hasattr(estimator, 'estimators_'):
+        return None
+
+    try:
+        forest = FlatForest.from_sklearn(estimator)
+        if forest.matches(estimator):
+            return forest
+        logger.error(f"Flat export of {type(estimator).__name__} disagrees with sklearn, not using it")
+    except Exception as e:
+        logger.error(f"Error compiling {type(estimator).__name__}: {str(e)}")
+
+    return None
+
+def inference_model(model, flat_model, n_rows):
+    """The flat export for request-sized inputs, the sklearn estimator otherwise"""
+    if flat_model is not None and n_rows <= FLAT_MAX_ROWS:
+        return flat_model
+    return model
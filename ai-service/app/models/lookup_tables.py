@@ -0,0 +1,106 @@
+"""Precomputed traffic prediction tables, exported for NumPy-only serving.
+
+TrafficPredictor and AdvancedTrafficModel already answer every in-range
+request from a table evaluated once over the discrete feature grid. This
+module exports those tables with their category labels to a single .npz
+file and serves them with nothing but NumPy, so an inference-only process
+(see lite.py) never imports pandas, scikit-learn or joblib:
+
+    traffic_locations, congestion_table   TrafficPredictor (location x hour x day_of_week)
+    advanced_locations, weathers,         AdvancedTrafficModel
+    prediction_table                      (location x hour x day_of_week x month x weather)
+
+Arrays are stored without pickles, so loading cannot run code from the file.
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+
+from utils.time_features import time_features
+
+def export_tables(path, traffic_predictor=None, advanced_model=None):
+    """Write the trained models' tables to path; returns the names of the exported models"""
+    arrays = {}
+    if traffic_predictor is not None and traffic_predictor.congestion_table is not None:
+        arrays['traffic_locations'] = np.array(traffic_predictor.location_encoder.classes_, dtype=str)
+        arrays['congestion_table'] = np.asarray(traffic_predictor.congestion_table, dtype=np.int8)
+        arrays['traffic_version'] = np.array(traffic_predictor.version or '', dtype=str)
+    if advanced_model is not None and advanced_model.prediction_table is not None:
+        arrays['advanced_locations'] = np.array(list(advanced_model.location_index), dtype=str)
+        arrays['weathers'] = np.array(list(advanced_model.weather_index), dtype=str)
+        # float32 keeps far more precision than the rounded congestion levels served from it
+        arrays['prediction_table'] = np.asarray(advanced_model.prediction_table, dtype=np.float32)
+        arrays['advanced_version'] = np.array(advanced_model.version or '', dtype=str)
+    if not arrays:
+        return []
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    return [name for name, key in (('traffic', 'congestion_table'), ('advanced', 'prediction_table')) if key in arrays]
+
+class LookupTables:
+    def __init__(self):
+        self.traffic_index = {}
+        self.congestion_table = None
+        self.traffic_version = None
+        self.advanced_index = {}
+        self.weather_index = {}
+        self.prediction_table = None
+        self.advanced_version = None
+
+    @classmethod
+    def load(cls, path):
+        tables = cls()
+        if not os.path.exists(path):
+            return tables
+
+        with np.load(path, allow_pickle=False) as data:
+            if 'congestion_table' in data:
+                tables.traffic_index = {name: code for code, name in enumerate(data['traffic_locations'].tolist())}
+                tables.congestion_table = data['congestion_table']
+                tables.traffic_version = str(data['traffic_version']) or None
+            if 'prediction_table' in data:
+                tables.advanced_index = {name: code for code, name in enumerate(data['advanced_locations'].tolist())}
+                tables.weather_index = {name: code for code, name in enumerate(data['weathers'].tolist())}
+                tables.prediction_table = data['prediction_table']
+                tables.advanced_version = str(data['advanced_version']) or None
+        return tables
+
+    @property
+    def has_traffic(self):
+        return self.congestion_table is not None
+
+    @property
+    def has_forecast(self):
+        return self.prediction_table is not None
+
+    def predict_traffic(self, location, hour, day_of_week):
+        """Congestion level from TrafficPredictor's table, None for unknown locations"""
+        code = self.traffic_index.get(location)
+        if code is None:
+            return None
+        return int(self.congestion_table[code, hour, day_of_week])
+
+    def forecast(self, locations=None, hours=24, start=None, weather='clear'):
+        """Same contract as AdvancedTrafficModel.forecast, served from the exported table"""
+        if locations is None:
+            locations = list(self.advanced_index)
+        locations = [location for location in locations if location in self.advanced_index]
+
+        start = np.datetime64(start if start is not None else datetime.now(), 'h')
+        timestamps = start + np.arange(hours)
+        calendar = time_features(timestamps)
+        codes = np.array([self.advanced_index[location] for location in locations], dtype=int)
+        weather_code = self.weather_index.get(weather, self.weather_index.get('clear', 0))
+
+        congestion = self.prediction_table[
+            codes[:, None],
+            calendar['hour'][None, :],
+            calendar['day_of_week'][None, :],
+            calendar['month'][None, :].astype(int) - 1,
+            weather_code
+        ]
+        return locations, timestamps.astype('datetime64[s]').tolist(), congestion
@@ -1,132 +1,561 @@
 import numpy as np
 import pandas as pd
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 import joblib
+import logging
 import os
+import random
+import time
+from datetime import datetime
+
+from models.flat_forest import compile_if_enabled, inference_model
+from utils.helpers import dump_artifact
+from utils.time_features import WEEKEND_START, time_features, weekend_flag
+from utils.metrics import (
+    FALLBACK_PREDICTIONS, MODEL_LOAD_SECONDS, MODEL_TRAIN_SECONDS, PREDICTIONS, observe_stage
+)
+
+logger = logging.getLogger(__name__)
+
+# Extent of the discrete time feature grid served from the prediction table
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+MONTHS_PER_YEAR = 12
+
+# Location-specific base congestion used to generate synthetic data
+SYNTHETIC_LOCATION_BASES = {
+    'Main St & 1st Ave': 5,
+    'Central Square': 6,
+    'Highway I-95': 4,
+    'Bridge Entrance': 7,
+    'Tunnel Exit': 8,
+    'Shopping District': 6,
+    'Financial District': 7,
+    'Residential Area North': 3,
+    'Industrial Zone': 4
+}
+SYNTHETIC_LOCATIONS = list(SYNTHETIC_LOCATION_BASES)
+
+# Weather conditions with their sampling probabilities and congestion impact
+WEATHER_IMPACTS = {
+    'clear': 0,
+    'rain': 1.5,
+    'snow': 2.5
+}
+WEATHER_CONDITIONS = list(WEATHER_IMPACTS)
+WEATHER_PROBABILITIES = [0.7, 0.25, 0.05]
+
+_LOCATION_BASE_VALUES = np.array([SYNTHETIC_LOCATION_BASES[name] for name in SYNTHETIC_LOCATIONS])
+_WEATHER_IMPACT_VALUES = np.array([WEATHER_IMPACTS[name] for name in WEATHER_CONDITIONS])
+
+# Default AdvancedTrafficModel forest settings
+ADVANCED_HYPERPARAMETERS = {
+    'n_estimators': 200,
+    'max_depth': 15,
+    'min_samples_split': 5
+}
+
+# Layout version of persisted model artifacts, bumped on incompatible changes
+ARTIFACT_VERSION = 1
+
+# Incremental updates: smallest batch accepted and how many locations and hours it must cover
+UPDATE_MIN_ROWS = 100
+UPDATE_MIN_LOCATIONS = 2
+UPDATE_MIN_HOURS = 6
+
+# Most recent training rows kept with a model, and how many of them each update refits on
+UPDATE_HISTORY_ROWS = 5000
+UPDATE_HISTORY_SAMPLE = 2000
+
+# Share of an update's rows held out to score every tree when the forest is over its cap
+UPDATE_HOLDOUT_FRACTION = 0.2
+
+def _recent_history(X, y):
+    """(X, y) of the last UPDATE_HISTORY_ROWS training rows, copied off the full training set"""
+    return np.array(np.asarray(X)[-UPDATE_HISTORY_ROWS:]), np.array(np.asarray(y, dtype=float)[-UPDATE_HISTORY_ROWS:])
+
+def _check_update_batch(X):
+    """ValueError unless the batch is large and varied enough to grow trees on; column 0 is the location, 1 the hour"""
+    if len(X) < UPDATE_MIN_ROWS:
+        raise ValueError(f"At least {UPDATE_MIN_ROWS} observations for known locations are needed, got {len(X)}")
+    
+    locations, hours = len(np.unique(X[:, 0])), len(np.unique(X[:, 1]))
+    if locations < UPDATE_MIN_LOCATIONS or hours < UPDATE_MIN_HOURS:
+        raise ValueError(f"Observations must cover at least {UPDATE_MIN_LOCATIONS} locations and "
+                         f"{UPDATE_MIN_HOURS} hours, got {locations} and {hours}")
+
+def _warm_start_forest(model, X, y, n_new_trees, max_estimators, n_jobs, X_holdout, y_holdout):
+    """Return a copy of a fitted forest with extra trees grown on (X, y).
+    
+    Past max_estimators the trees with the largest error on the held-out rows
+    are dropped, whatever their age.
+    """
+    # Same hyperparameters; a fresh list of the fitted trees so the serving forest is never mutated
+    updated = clone(model)
+    updated.estimators_ = list(model.estimators_)
+    updated.set_params(warm_start=True, n_estimators=len(updated.estimators_) + n_new_trees, n_jobs=n_jobs)
+    updated.fit(X, y)
+    # Training parallelism only, single-request inference stays single-threaded
+    updated.set_params(n_jobs=None)
+    
+    if len(updated.estimators_) > max_estimators:
+        errors = [np.mean((tree.predict(X_holdout) - y_holdout) ** 2) for tree in updated.estimators_]
+        keep = np.sort(np.argsort(errors, kind='stable')[:max_estimators])
+        updated.estimators_ = [updated.estimators_[i] for i in keep]
+        updated.set_params(n_estimators=max_estimators)
+    
+    return updated
+
+def _incremental_fit(model, history, X, y, n_new_trees, max_estimators, n_jobs=None):
+    """(forest, history) after growing n_new_trees on a new batch plus a sample of recent history.
+    
+    Mixing in history keeps a small or skewed batch from rewriting predictions
+    for the locations and hours it does not cover. ValueError when the batch
+    fails _check_update_batch or the model kept no history.
+    """
+    if history is None:
+        raise ValueError("The model was saved without training history, retrain it before updating")
+    _check_update_batch(X)
+    
+    history_X, history_y = history
+    rng = np.random.default_rng()
+    sample = rng.choice(len(history_y), size=min(len(history_y), UPDATE_HISTORY_SAMPLE), replace=False)
+    rows_X = np.vstack([X, history_X[sample]])
+    rows_y = np.concatenate([y, history_y[sample]])
+    
+    order = rng.permutation(len(rows_y))
+    holdout, fit = np.split(order, [int(len(order) * UPDATE_HOLDOUT_FRACTION)])
+    forest = _warm_start_forest(model, rows_X[fit], rows_y[fit], n_new_trees, max_estimators, n_jobs,
+                                rows_X[holdout], rows_y[holdout])
+    
+    return forest, _recent_history(np.vstack([history_X, X]), np.concatenate([history_y, y]))
+
+def _fallback_congestion(model, count=None):
+    """Random mid-range congestion used when no prediction is possible, counted per model"""
+    if count is None:
+        FALLBACK_PREDICTIONS.inc(model=model)
+        return random.randint(3, 7)
+    FALLBACK_PREDICTIONS.inc(count, model=model)
+    return [random.randint(3, 7) for _ in range(count)]
+
+class TrafficPredictor:
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+        self.model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        self.flat_model = None
+        self.location_encoder = LabelEncoder()
+        self.location_index = {}
+        self.features = ['location', 'hour', 'day_of_week', 'is_weekend']
+        self.congestion_table = None
+        # (X, y) of the most recent training rows, refitted on by incremental updates
+        self.history = None
+        self.model_path = "models/traffic_predictor.joblib"
+        self.version = None
+        self.is_trained = False
+        
+    def train_model(self, data=None):
+        """Train the traffic prediction model, on mock data when no history is given.
+        
+        data is a frame with location, hour, day_of_week and congestion columns,
+        e.g. DataProcessor.process_traffic_columns(BulkLoader.traffic_history()).
+        """
+        started = time.perf_counter()
+        try:
+            if data is not None:
+                df = data.assign(is_weekend=weekend_flag(data['day_of_week']))
+            else:
+                # Generate mock training data
+                np.random.seed(42)
+                locations = ['Main St & 1st Ave', 'Central Square', 'Highway I-95', 'Bridge Entrance', 'Tunnel Exit']
+                n_samples = 1000
+                
+                data = []
+                for _ in range(n_samples):
+                    location = random.choice(locations)
+                    hour = random.randint(0, 23)
+                    day_of_week = random.randint(0, 6)
+                    is_weekend = 1 if day_of_week >= 5 else 0
+                    
+                    # Base congestion based on location and time
+                    base_congestion = {
+                        'Main St & 1st Ave': 5 + 2 * np.sin(hour * np.pi / 12),
+                        'Central Square': 4 + 3 * np.sin(hour * np.pi / 12),
+                        'Highway I-95': 3 + 4 * np.sin((hour - 7) * np.pi / 12),
+                        'Bridge Entrance': 6 + 3 * np.sin((hour - 8) * np.pi / 12),
+                        'Tunnel Exit': 7 + 2 * np.sin((hour - 17) * np.pi / 12)
+                    }
+                    
+                    congestion = max(1, min(10, base_congestion[location] + random.gauss(0, 1)))
+                    
+                    data.append({
+                        'location': location,
+                        'hour': hour,
+                        'day_of_week': day_of_week,
+                        'is_weekend': is_weekend,
+                        'congestion': congestion
+                    })
+                
+                df = pd.DataFrame(data)
+            
+            # Encode locations
+            locations_encoded = self.location_encoder.fit_transform(df['location'])
+            
+            # Prepare features
+            X = np.column_stack([
+                locations_encoded,
+                df['hour'],
+                df['day_of_week'],
+                df['is_weekend']
+            ])
+            y = df['congestion']
+            
+            # Train model
+            self.model.fit(X, y)
+            self.history = _recent_history(X, y)
+            self.location_index = {
+                location: code for code, location in enumerate(self.location_encoder.classes_)
+            }
+            self._build_congestion_table()
+            # Training parallelism only, single-request inference stays single-threaded
+            self.model.set_params(n_jobs=None)
+            self.flat_model = compile_if_enabled(self.model)
+            self.version = datetime.now().strftime('%Y%m%d%H%M%S')
+            self.is_trained = True
+            MODEL_TRAIN_SECONDS.set(time.perf_counter() - started, model='traffic')
+            logger.info("Traffic prediction model trained successfully")
+            
+        except Exception as e:
+            logger.error(f"Error training traffic model: {str(e)}")
+            self.is_trained = False
+    
+    def save_model(self):
+        """Persist the trained model and its congestion table as a versioned artifact"""
+        dump_artifact({
+            'artifact_version': ARTIFACT_VERSION,
+            'version': self.version,
+            'model': self.model,
+            'location_encoder': self.location_encoder,
+            'congestion_table': self.congestion_table,
+            'history': self.history
+        }, self.model_path)
+        logger.info(f"Traffic prediction model {self.version} saved to {self.model_path}")
+    
+    def load_model(self):
+        """Memory-map a persisted artifact instead of training"""
+        started = time.perf_counter()
+        try:
+            if os.path.exists(self.model_path):
+                loaded = joblib.load(self.model_path, mmap_mode='r')
+                if loaded.get('artifact_version') != ARTIFACT_VERSION:
+                    logger.error(f"Unsupported traffic model artifact at {self.model_path}")
+                    return False
+                
+                self.model = loaded['model']
+                self.flat_model = compile_if_enabled(self.model)
+                self.location_encoder = loaded['location_encoder']
+                self.location_index = {
+                    location: code for code, location in enumerate(self.location_encoder.classes_)
+                }
+                self.congestion_table = loaded['congestion_table']
+                self.history = loaded.get('history')
+                self.version = loaded['version']
+                self.is_trained = True
+                MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='traffic')
+                logger.info(f"Traffic prediction model {self.version} loaded from {self.model_path}")
+                return True
+        except Exception as e:
+            logger.error(f"Error loading traffic model: {str(e)}")
+        
+        return False
+    
+    def incremental_update(self, observations, n_new_trees=10, max_estimators=200):
+        """Return a new predictor whose forest also covers newly observed traffic.
+        
+        observations is a DataFrame with location, hour, day_of_week and congestion
+        columns (e.g. DataProcessor.process_traffic_data output). Rows for locations
+        the model was not trained on are ignored. Returns None when nothing is usable,
+        raises ValueError when the rest is too small or narrow (see _incremental_fit).
+        The current predictor is left untouched so it can keep serving until swapped.
+        """
+        if not self.is_trained:
+            return None
+        
+        df = observations[observations['location'].isin(list(self.location_index))]
+        if df.empty:
+            return None
+        
+        day_of_week = df['day_of_week'].to_numpy()
+        X = np.column_stack([
+            df['location'].map(self.location_index).to_numpy(dtype=int),
+            df['hour'].to_numpy(),
+            day_of_week,
+            weekend_flag(day_of_week)
+        ])
+        
+        updated = TrafficPredictor(n_jobs=self.n_jobs)
+        updated.model, updated.history = _incremental_fit(self.model, self.history, X, df['congestion'].to_numpy(),
+                                                          n_new_trees, max_estimators, self.n_jobs)
+        updated.flat_model = compile_if_enabled(updated.model)
+        updated.location_encoder = self.location_encoder
+        updated.location_index = self.location_index
+        updated.model_path = self.model_path
+        updated._build_congestion_table()
+        updated.version = datetime.now().strftime('%Y%m%d%H%M%S')
+        updated.is_trained = True
+        logger.info(f"Traffic prediction model updated with {len(df)} observations ({len(updated.model.estimators_)} trees)")
+        
+        return updated
+    
+    def _build_congestion_table(self):
+        """Evaluate the forest once over every (location, hour, day_of_week) combination"""
+        codes, hours, days = np.meshgrid(
+            np.arange(len(self.location_encoder.classes_)),
+            np.arange(HOURS_PER_DAY),
+            np.arange(DAYS_PER_WEEK),
+            indexing='ij'
+        )
+        
+        X = np.column_stack([
+            codes.ravel(),
+            hours.ravel(),
+            days.ravel(),
+            weekend_flag(days.ravel())
+        ])
+        
+        predictions = np.clip(np.rint(self.model.predict(X)), 1, 10)
+        self.congestion_table = predictions.astype(np.int8).reshape(codes.shape)
+    
+    def canary(self, n_rows=256):
+        """Check the forest against the prediction table on a sample of its grid, ValueError on mismatch"""
+        if self.congestion_table is None or self.congestion_table.shape[0] != len(self.location_index):
+            raise ValueError("Prediction table does not match the location encoder")
+        
+        grid = np.random.default_rng(0).integers(0, self.congestion_table.shape, size=(n_rows, 3))
+        X = np.column_stack([grid, weekend_flag(grid[:, 2])])
+        predictions = np.clip(np.rint(self.model.predict(X)), 1, 10)
+        if (predictions != self.congestion_table[grid[:, 0], grid[:, 1], grid[:, 2]]).any():
+            raise ValueError("Prediction table disagrees with the forest")
+        return n_rows
+    
+    def predict(self, location, hour=None, day_of_week=None):
+        """Predict traffic congestion for a location"""
+        PREDICTIONS.inc(model='traffic')
+        try:
+            if not self.is_trained and not self.load_model():
+                # Never train on the request path, fall back until an artifact exists
+                return _fallback_congestion('traffic')
+            
+            if hour is None:
+                hour = datetime.now().hour
+            if day_of_week is None:
+                day_of_week = datetime.now().weekday()
+            
+            is_weekend = int(weekend_flag(day_of_week))
+            
+            # Encode location
+            if location not in self.location_index:
+                # If unknown location, use average
+                return _fallback_congestion('traffic')
+            
+            location_encoded = self.location_index[location]
+            
+            # Serve the discrete feature space straight from the precomputed table
+            if 0 <= hour < HOURS_PER_DAY and 0 <= day_of_week < DAYS_PER_WEEK:
+                return int(self.congestion_table[location_encoded, int(hour), int(day_of_week)])
+            
+            # Prepare features
+            X = np.array([[location_encoded, hour, day_of_week, is_weekend]])
+            
+            prediction = inference_model(self.model, self.flat_model, 1).predict(X)[0]
+            return max(1, min(10, round(prediction)))
+            
+        except Exception as e:
+            logger.error(f"Error predicting traffic: {str(e)}")
+            # Fallback prediction
+            return _fallback_congestion('traffic')
+    
+    def predict_batch(self, queries):
+        """Predict traffic congestion for many (location, hour, day_of_week) queries in one model call"""
+        PREDICTIONS.inc(len(queries), model='traffic')
+        try:
+            if not self.is_trained and not self.load_model():
+                return _fallback_congestion('traffic', len(queries))
+            
+            with observe_stage('traffic', 'encode'):
+                now = datetime.now()
+                codes = np.array([self.location_index.get(location, -1) for location, _, _ in queries], dtype=int)
+                hours = np.array([now.hour if hour is None else hour for _, hour, _ in queries], dtype=int)
+                days = np.array([now.weekday() if day is None else day for _, _, day in queries], dtype=int)
+            
+            with observe_stage('traffic', 'inference'):
+                predictions = np.empty(len(queries), dtype=int)
+                known = codes >= 0
+                in_table = (
+                    known
+                    & (hours >= 0) & (hours < HOURS_PER_DAY)
+                    & (days >= 0) & (days < DAYS_PER_WEEK)
+                )
+                
+                # Lookup for the discrete feature space, one gather for the whole batch
+                predictions[in_table] = self.congestion_table[codes[in_table], hours[in_table], days[in_table]]
+                
+                off_table = known & ~in_table
+                if off_table.any():
+                    # One feature matrix and one forest call for the remaining known locations
+                    X = np.column_stack([
+                        codes[off_table],
+                        hours[off_table],
+                        days[off_table],
+                        weekend_flag(days[off_table])
+                    ])
+                    forest = inference_model(self.model, self.flat_model, len(X))
+                    predictions[off_table] = np.clip(np.rint(forest.predict(X)), 1, 10)
+            
+            # Unknown locations get the same fallback as predict()
+            unknown = int((~known).sum())
+            if unknown:
+                predictions[~known] = _fallback_congestion('traffic', unknown)
+            
+            return predictions.tolist()
+            
+        except Exception as e:
+            logger.error(f"Error predicting traffic batch: {str(e)}")
+            return _fallback_congestion('traffic', len(queries))
 
 class AdvancedTrafficModel:
-    def __init__(self):
+    def __init__(self, n_jobs=None, hyperparameters=None):
+        self.n_jobs = n_jobs
+        # Forest settings, see services.model_search for choosing them
+        self.hyperparameters = {**ADVANCED_HYPERPARAMETERS, **(hyperparameters or {})}
         self.model = None
+        self.flat_model = None
         self.location_encoder = LabelEncoder()
+        self.weather_encoder = LabelEncoder()
+        self.location_index = {}
+        self.weather_index = {}
+        self.features = ['location', 'hour', 'day_of_week', 'month', 'is_weekend', 'is_holiday', 'weather']
+        self.prediction_table = None
+        # (X, y) of the most recent training rows, refitted on by incremental updates
+        self.history = None
         self.model_path = "models/traffic_model.joblib"
+        self.version = None
         self.is_trained = False
         
-    def create_synthetic_data(self, n_samples=5000):
+    def create_synthetic_data(self, n_samples=5000, random_state=None):
         """Create comprehensive synthetic traffic data"""
-        locations = [
-            'Main St & 1st Ave', 'Central Square', 'Highway I-95', 
-            'Bridge Entrance', 'Tunnel Exit', 'Shopping District',
-            'Financial District', 'Residential Area North', 'Industrial Zone'
-        ]
-        
-        data = []
-        for _ in range(n_samples):
-            location = np.random.choice(locations)
-            hour = np.random.randint(0, 24)
-            day_of_week = np.random.randint(0, 7)
-            month = np.random.randint(1, 13)
-            is_weekend = 1 if day_of_week >= 5 else 0
-            is_holiday = np.random.choice([0, 1], p=[0.95, 0.05])
-            weather = np.random.choice(['clear', 'rain', 'snow'], p=[0.7, 0.25, 0.05])
-            
-            # Complex congestion calculation
-            base_congestion = self._calculate_base_congestion(location, hour, day_of_week)
-            weather_impact = self._get_weather_impact(weather)
-            holiday_impact = 0.2 if is_holiday else 0
-            random_variation = np.random.normal(0, 0.5)
-            
-            congestion = base_congestion + weather_impact + holiday_impact + random_variation
-            congestion = max(1, min(10, round(congestion)))
-            
-            data.append({
-                'location': location,
-                'hour': hour,
-                'day_of_week': day_of_week,
-                'month': month,
-                'is_weekend': is_weekend,
-                'is_holiday': is_holiday,
-                'weather': weather,
-                'congestion': congestion
-            })
-        
-        return pd.DataFrame(data)
+        return self._synthetic_chunk(n_samples, np.random.default_rng(random_state))
     
-    def _calculate_base_congestion(self, location, hour, day_of_week):
-        """Calculate base congestion based on location and time patterns"""
-        # Location-specific base congestion
-        location_bases = {
-            'Main St & 1st Ave': 5,
-            'Central Square': 6,
-            'Highway I-95': 4,
-            'Bridge Entrance': 7,
-            'Tunnel Exit': 8,
-            'Shopping District': 6,
-            'Financial District': 7,
-            'Residential Area North': 3,
-            'Industrial Zone': 4
-        }
+    def iter_synthetic_data(self, n_samples, chunk_size=100000, random_state=None):
+        """Yield synthetic traffic data as DataFrames of at most chunk_size rows"""
+        rng = np.random.default_rng(random_state)
+        for start in range(0, n_samples, chunk_size):
+            yield self._synthetic_chunk(min(chunk_size, n_samples - start), rng)
+    
+    def _synthetic_chunk(self, n_samples, rng):
+        """Draw one block of synthetic rows with array operations only"""
+        location_codes = rng.integers(0, len(SYNTHETIC_LOCATIONS), n_samples)
+        hour = rng.integers(0, HOURS_PER_DAY, n_samples)
+        day_of_week = rng.integers(0, DAYS_PER_WEEK, n_samples)
+        month = rng.integers(1, MONTHS_PER_YEAR + 1, n_samples)
+        is_weekend = weekend_flag(day_of_week)
+        is_holiday = rng.choice([0, 1], size=n_samples, p=[0.95, 0.05])
+        weather_codes = rng.choice(len(WEATHER_CONDITIONS), size=n_samples, p=WEATHER_PROBABILITIES)
         
-        base = location_bases.get(location, 5)
+        # Complex congestion calculation
+        base_congestion = (
+            _LOCATION_BASE_VALUES[location_codes] + self._rush_hour_penalty(hour, day_of_week)
+        )
+        weather_impact = _WEATHER_IMPACT_VALUES[weather_codes]
+        holiday_impact = 0.2 * is_holiday
+        random_variation = rng.normal(0, 0.5, n_samples)
         
-        # Time patterns
-        rush_hour_penalty = 0
-        if (7 <= hour <= 9) or (16 <= hour <= 18):  # Rush hours
-            rush_hour_penalty = 2
-        elif day_of_week >= 5:  # Weekend
-            rush_hour_penalty = -1 if hour < 12 else 1
+        congestion = base_congestion + weather_impact + holiday_impact + random_variation
+        congestion = np.clip(np.rint(congestion), 1, 10).astype(int)
         
-        return base + rush_hour_penalty
+        return pd.DataFrame({
+            'location': pd.Categorical.from_codes(location_codes, SYNTHETIC_LOCATIONS),
+            'hour': hour,
+            'day_of_week': day_of_week,
+            'month': month,
+            'is_weekend': is_weekend,
+            'is_holiday': is_holiday,
+            'weather': pd.Categorical.from_codes(weather_codes, WEATHER_CONDITIONS),
+            'congestion': congestion
+        })
+    
+    @staticmethod
+    def _rush_hour_penalty(hour, day_of_week):
+        """Time pattern adjustment, works on scalars and arrays alike"""
+        rush_hours = ((7 <= hour) & (hour <= 9)) | ((16 <= hour) & (hour <= 18))
+        weekend = np.where(hour < 12, -1, 1)
+        return np.where(rush_hours, 2, np.where(day_of_week >= WEEKEND_START, weekend, 0))
+    
+    def _calculate_base_congestion(self, location, hour, day_of_week):
+        """Calculate base congestion based on location and time patterns"""
+        base = SYNTHETIC_LOCATION_BASES.get(location, 5)
+        return base + int(self._rush_hour_penalty(hour, day_of_week))
     
     def _get_weather_impact(self, weather):
         """Get congestion impact based on weather"""
-        weather_impacts = {
-            'clear': 0,
-            'rain': 1.5,
-            'snow': 2.5
-        }
-        return weather_impacts.get(weather, 0)
+        return WEATHER_IMPACTS.get(weather, 0)
     
-    def train(self):
-        """Train the advanced traffic model"""
-        try:
+    def training_matrix(self, data=None):
+        """Fit the encoders and return the (X, y) the forest trains on, rows in the order given.
+        
+        data needs location, hour, day_of_week, month and congestion columns;
+        is_holiday and weather default to 0 and 'clear' when absent. Without
+        data, synthetic rows are generated.
+        """
+        if data is None:
             print("Generating synthetic traffic data...")
             df = self.create_synthetic_data(5000)
-            
-            # Encode categorical variables
-            location_encoded = self.location_encoder.fit_transform(df['location'])
-            weather_encoded = LabelEncoder().fit_transform(df['weather'])
-            
-            # Prepare features
-            X = np.column_stack([
-                location_encoded,
-                df['hour'],
-                df['day_of_week'],
-                df['month'],
-                df['is_weekend'],
-                df['is_holiday'],
-                weather_encoded
-            ])
-            
-            y = df['congestion']
+        else:
+            df = data.assign(
+                is_weekend=weekend_flag(data['day_of_week']),
+                is_holiday=data['is_holiday'] if 'is_holiday' in data else 0,
+                weather=data['weather'] if 'weather' in data else 'clear'
+            )
+        
+        # Encode categorical variables, every weather condition gets a code even if unseen
+        location_encoded = self.location_encoder.fit_transform(df['location'])
+        weather_encoded = self.weather_encoder.fit(WEATHER_CONDITIONS).transform(df['weather'])
+        
+        # Prepare features
+        X = np.column_stack([
+            location_encoded,
+            df['hour'],
+            df['day_of_week'],
+            df['month'],
+            df['is_weekend'],
+            df['is_holiday'],
+            weather_encoded
+        ])
+        
+        return X, df['congestion'].to_numpy()
+    
+    def train(self, data=None):
+        """Train the advanced traffic model, on synthetic data when no history is given (see training_matrix)"""
+        started = time.perf_counter()
+        try:
+            X, y = self.training_matrix(data)
             
             # Train model
-            self.model = RandomForestRegressor(
-                n_estimators=200,
-                max_depth=15,
-                min_samples_split=5,
-                random_state=42
-            )
+            self.model = RandomForestRegressor(**self.hyperparameters, random_state=42, n_jobs=self.n_jobs)
             
             self.model.fit(X, y)
+            self.history = _recent_history(X, y)
+            self._build_prediction_table()
+            # Training parallelism only, single-request inference stays single-threaded
+            self.model.set_params(n_jobs=None)
+            self.flat_model = compile_if_enabled(self.model)
+            self.version = datetime.now().strftime('%Y%m%d%H%M%S')
             self.is_trained = True
+            MODEL_TRAIN_SECONDS.set(time.perf_counter() - started, model='advanced')
             
             # Save model
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-            joblib.dump({
-                'model': self.model,
-                'location_encoder': self.location_encoder
-            }, self.model_path)
+            self.save_model()
             
             print("Advanced traffic model trained and saved successfully!")
             return True
@@ -135,14 +564,47 @@ class AdvancedTrafficModel:
             print(f"Error training advanced model: {str(e)}")
             return False
     
+    def save_model(self):
+        """Persist the model, encoders and prediction table as a versioned artifact"""
+        dump_artifact({
+            'artifact_version': ARTIFACT_VERSION,
+            'version': self.version,
+            'model': self.model,
+            'location_encoder': self.location_encoder,
+            'weather_encoder': self.weather_encoder,
+            'prediction_table': self.prediction_table,
+            'history': self.history
+        }, self.model_path)
+    
     def load_model(self):
         """Load pre-trained model"""
+        started = time.perf_counter()
         try:
             if os.path.exists(self.model_path):
-                loaded = joblib.load(self.model_path)
+                # Arrays stay on disk and are shared between processes through the page cache
+                loaded = joblib.load(self.model_path, mmap_mode='r')
                 self.model = loaded['model']
+                self.flat_model = compile_if_enabled(self.model)
+                # The artifact's forest settings, whatever this instance was constructed with
+                params = self.model.get_params()
+                self.hyperparameters = {name: params[name] for name in self.hyperparameters}
                 self.location_encoder = loaded['location_encoder']
+                self.history = loaded.get('history')
+                if 'weather_encoder' in loaded:
+                    self.weather_encoder = loaded['weather_encoder']
+                else:
+                    # Older artifacts were trained with the same sorted weather labels
+                    self.weather_encoder = LabelEncoder().fit(['clear', 'rain', 'snow'])
+                
+                if loaded.get('artifact_version') == ARTIFACT_VERSION:
+                    self._index_encoders()
+                    self.prediction_table = loaded['prediction_table']
+                    self.version = loaded['version']
+                else:
+                    # Unversioned artifacts predate the persisted prediction table
+                    self._build_prediction_table()
                 self.is_trained = True
+                MODEL_LOAD_SECONDS.set(time.perf_counter() - started, model='advanced')
                 print("Advanced traffic model loaded successfully!")
                 return True
         except Exception as e:
@@ -150,8 +612,109 @@ class AdvancedTrafficModel:
         
         return False
     
+    def incremental_update(self, observations, n_new_trees=20, max_estimators=400):
+        """Return a new model with extra trees fitted on newly observed traffic.
+        
+        observations needs location, hour, day_of_week, month and congestion columns;
+        is_holiday and weather default to 0 and 'clear' when absent. Returns None
+        when no row is for a known location, raises ValueError when the batch is
+        too small or narrow (see _incremental_fit). The current model keeps
+        serving unchanged until the caller swaps in the returned one.
+        """
+        if not self.is_trained:
+            return None
+        
+        df = observations[observations['location'].isin(list(self.location_index))]
+        if df.empty:
+            return None
+        
+        clear = self.weather_index.get('clear', 0)
+        weather = df['weather'] if 'weather' in df else pd.Series('clear', index=df.index)
+        is_holiday = df['is_holiday'].to_numpy() if 'is_holiday' in df else np.zeros(len(df), dtype=int)
+        day_of_week = df['day_of_week'].to_numpy()
+        
+        X = np.column_stack([
+            df['location'].map(self.location_index).to_numpy(dtype=int),
+            df['hour'].to_numpy(),
+            day_of_week,
+            df['month'].to_numpy(),
+            weekend_flag(day_of_week),
+            is_holiday,
+            weather.map(self.weather_index).fillna(clear).to_numpy(dtype=int)
+        ])
+        
+        updated = AdvancedTrafficModel(n_jobs=self.n_jobs, hyperparameters=self.hyperparameters)
+        updated.model, updated.history = _incremental_fit(self.model, self.history, X, df['congestion'].to_numpy(),
+                                                          n_new_trees, max_estimators, self.n_jobs)
+        updated.flat_model = compile_if_enabled(updated.model)
+        updated.location_encoder = self.location_encoder
+        updated.weather_encoder = self.weather_encoder
+        updated.model_path = self.model_path
+        updated._build_prediction_table()
+        updated.version = datetime.now().strftime('%Y%m%d%H%M%S')
+        updated.is_trained = True
+        
+        return updated
+    
+    def _index_encoders(self):
+        """Build constant-time category lookups from the fitted encoders"""
+        self.location_index = {
+            location: code for code, location in enumerate(self.location_encoder.classes_)
+        }
+        self.weather_index = {
+            weather: code for code, weather in enumerate(self.weather_encoder.classes_)
+        }
+    
+    def _build_prediction_table(self):
+        """Evaluate the forest once over every location, time, month and weather combination"""
+        self._index_encoders()
+        
+        codes, hours, days, months, weathers = np.meshgrid(
+            np.arange(len(self.location_index)),
+            np.arange(HOURS_PER_DAY),
+            np.arange(DAYS_PER_WEEK),
+            np.arange(1, MONTHS_PER_YEAR + 1),
+            np.arange(len(self.weather_index)),
+            indexing='ij'
+        )
+        
+        # is_holiday is not exposed by predict(), so the table covers non-holidays only
+        X = np.column_stack([
+            codes.ravel(),
+            hours.ravel(),
+            days.ravel(),
+            months.ravel(),
+            weekend_flag(days.ravel()),
+            np.zeros(codes.size, dtype=int),
+            weathers.ravel()
+        ])
+        
+        self.prediction_table = self.model.predict(X).reshape(codes.shape)
+    
+    def canary(self, n_rows=256):
+        """Check the forest against the prediction table on a sample of its grid, ValueError on mismatch"""
+        table = self.prediction_table
+        if table is None or table.shape[0] != len(self.location_index) or table.shape[4] != len(self.weather_index):
+            raise ValueError("Prediction table does not match the encoders")
+        
+        grid = np.random.default_rng(0).integers(0, table.shape, size=(n_rows, 5))
+        X = np.column_stack([
+            grid[:, 0],
+            grid[:, 1],
+            grid[:, 2],
+            grid[:, 3] + 1,
+            weekend_flag(grid[:, 2]),
+            np.zeros(n_rows, dtype=int),
+            grid[:, 4]
+        ])
+        predictions = self.model.predict(X)
+        if not np.allclose(predictions, table[tuple(grid.T)]):
+            raise ValueError("Prediction table disagrees with the forest")
+        return n_rows
+    
     def predict(self, location, hour=None, day_of_week=None, month=None, weather='clear'):
         """Make prediction using advanced model"""
+        PREDICTIONS.inc(model='advanced')
         try:
             if not self.is_trained and not self.load_model():
                 return self._fallback_prediction()
@@ -166,28 +729,35 @@ class AdvancedTrafficModel:
             if month is None:
                 month = now.month
             
-            is_weekend = 1 if day_of_week >= 5 else 0
+            is_weekend = int(weekend_flag(day_of_week))
             is_holiday = 0  # Simplified
             
             # Encode inputs
-            if location not in self.location_encoder.classes_:
+            if location not in self.location_index:
                 return self._fallback_prediction()
             
-            location_encoded = self.location_encoder.transform([location])[0]
-            weather_encoded = 0  # Default to clear
+            location_encoded = self.location_index[location]
+            weather_encoded = self.weather_index.get(weather, self.weather_index.get('clear', 0))
             
-            # Prepare features
-            X = np.array([[
-                location_encoded,
-                hour,
-                day_of_week,
-                month,
-                is_weekend,
-                is_holiday,
-                weather_encoded
-            ]])
-            
-            prediction = self.model.predict(X)[0]
+            if (0 <= hour < HOURS_PER_DAY and 0 <= day_of_week < DAYS_PER_WEEK
+                    and 1 <= month <= MONTHS_PER_YEAR):
+                # Discrete feature space is served from the precomputed table
+                prediction = self.prediction_table[
+                    location_encoded, int(hour), int(day_of_week), int(month) - 1, weather_encoded
+                ]
+            else:
+                # Prepare features
+                X = np.array([[
+                    location_encoded,
+                    hour,
+                    day_of_week,
+                    month,
+                    is_weekend,
+                    is_holiday,
+                    weather_encoded
+                ]])
+                
+                prediction = inference_model(self.model, self.flat_model, 1).predict(X)[0]
             confidence = min(0.95, max(0.7, 1 - (abs(prediction - round(prediction)) * 2)))
             
             return {
@@ -200,10 +770,58 @@ class AdvancedTrafficModel:
             print(f"Advanced prediction error: {str(e)}")
             return self._fallback_prediction()
     
+    def forecast(self, locations=None, hours=24, start=None, weather='clear'):
+        """Forecast congestion for every location over the next `hours` hours in one pass.
+        
+        Returns (locations, timestamps, congestion) where congestion is a
+        len(locations) x hours float array; unknown locations are dropped. Time
+        features for the whole horizon are derived once and shared by all locations.
+        """
+        if not self.is_trained and not self.load_model():
+            return [], [], np.empty((0, hours))
+        
+        if locations is None:
+            locations = list(self.location_index)
+        locations = [location for location in locations if location in self.location_index]
+        
+        start = pd.Timestamp(start if start is not None else datetime.now()).floor('h')
+        timestamps = pd.date_range(start, periods=hours, freq='h')
+        
+        codes = np.array([self.location_index[location] for location in locations], dtype=int)
+        calendar = time_features(timestamps.to_numpy())
+        hour = calendar['hour'].astype(int)
+        day_of_week = calendar['day_of_week'].astype(int)
+        month = calendar['month'].astype(int)
+        weather_encoded = self.weather_index.get(weather, self.weather_index.get('clear', 0))
+        
+        with observe_stage('advanced', 'inference'):
+            if self.prediction_table is not None:
+                # One gather over the (location x horizon) grid
+                congestion = self.prediction_table[
+                    codes[:, None], hour[None, :], day_of_week[None, :], month[None, :] - 1, weather_encoded
+                ]
+            else:
+                # One feature tensor and one forest call for the whole grid
+                n_locations, n_hours = len(codes), len(hour)
+                X = np.column_stack([
+                    np.repeat(codes, n_hours),
+                    np.tile(hour, n_locations),
+                    np.tile(day_of_week, n_locations),
+                    np.tile(month, n_locations),
+                    np.tile(calendar['is_weekend'], n_locations),
+                    np.zeros(n_locations * n_hours, dtype=int),
+                    np.full(n_locations * n_hours, weather_encoded)
+                ])
+                forest = inference_model(self.model, self.flat_model, len(X))
+                congestion = forest.predict(X).reshape(n_locations, n_hours)
+        
+        PREDICTIONS.inc(congestion.size, model='advanced')
+        return locations, list(timestamps.to_pydatetime()), congestion
+    
     def _fallback_prediction(self):
         """Fallback prediction when model is unavailable"""
         return {
-            'prediction': random.randint(3, 7),
+            'prediction': _fallback_congestion('advanced'),
             'confidence': 0.5,
             'model': 'fallback'
         }
@@ -1,39 +1,85 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from itertools import islice
+
+from utils.time_features import time_features
+
+# Source columns read from the traffic_data and emergency_incidents tables
+TRAFFIC_FIELDS = ['location', 'congestion_level', 'vehicle_count', 'timestamp']
+EMERGENCY_FIELDS = ['location', 'incident_type', 'severity', 'reported_at']
 
 class DataProcessor:
-    def __init__(self):
-        pass
-    
+    def __init__(self, chunk_size=10000):
+        self.chunk_size = chunk_size
+
     def process_traffic_data(self, raw_data):
         """Process raw traffic data for ML models"""
-        processed = []
-        
-        for data_point in raw_data:
-            processed.append({
-                'location': data_point['location'],
-                'congestion': data_point['congestion_level'],
-                'hour': data_point['timestamp'].hour,
-                'day_of_week': data_point['timestamp'].weekday(),
-                'month': data_point['timestamp'].month,
-                'vehicles': data_point['vehicle_count']
-            })
-        
-        return pd.DataFrame(processed)
-    
+        return self._traffic_frame(pd.DataFrame.from_records(list(raw_data), columns=TRAFFIC_FIELDS))
+
     def process_emergency_data(self, raw_data):
         """Process raw emergency data for ML models"""
-        processed = []
-        
-        for data_point in raw_data:
-            processed.append({
-                'location': data_point['location'],
-                'type': data_point['incident_type'],
-                'severity': data_point['severity'],
-                'hour': data_point['reported_at'].hour,
-                'day_of_week': data_point['reported_at'].weekday(),
-                'month': data_point['reported_at'].month
-            })
-        
-        return pd.DataFrame(processed)
+        return self._emergency_frame(pd.DataFrame.from_records(list(raw_data), columns=EMERGENCY_FIELDS))
+
+    def process_traffic_columns(self, columns):
+        """Process traffic history that is already columnar (e.g. BulkLoader.traffic_history)"""
+        return self._traffic_frame(pd.DataFrame(columns, columns=TRAFFIC_FIELDS))
+
+    def process_emergency_columns(self, columns):
+        """Process emergency history that is already columnar (e.g. BulkLoader.emergency_history)"""
+        return self._emergency_frame(pd.DataFrame(columns, columns=EMERGENCY_FIELDS))
+
+    def iter_traffic_data(self, source, chunk_size=None):
+        """Stream traffic rows from an iterable or DB-API cursor as typed column batches"""
+        for chunk in self._iter_chunks(source, TRAFFIC_FIELDS, chunk_size):
+            yield self._traffic_frame(chunk)
+
+    def iter_emergency_data(self, source, chunk_size=None):
+        """Stream emergency rows from an iterable or DB-API cursor as typed column batches"""
+        for chunk in self._iter_chunks(source, EMERGENCY_FIELDS, chunk_size):
+            yield self._emergency_frame(chunk)
+
+    def _iter_chunks(self, source, fields, chunk_size):
+        """Read fixed-size chunks so only one chunk of raw rows is held in memory"""
+        chunk_size = chunk_size or self.chunk_size
+
+        if hasattr(source, 'fetchmany'):
+            # DB-API cursor, rows are tuples in cursor.description order
+            columns = [column[0] for column in source.description]
+            while True:
+                rows = source.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+        rows = iter(source)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield pd.DataFrame.from_records(chunk, columns=fields)
+
+    def _traffic_frame(self, raw):
+        """Derive time features for a block of traffic rows with shared vectorized calendar features"""
+        calendar = time_features(pd.to_datetime(raw['timestamp']).to_numpy())
+
+        return pd.DataFrame({
+            'location': raw['location'].astype('category'),
+            'congestion': raw['congestion_level'].astype(np.int8),
+            'hour': calendar['hour'],
+            'day_of_week': calendar['day_of_week'],
+            'month': calendar['month'],
+            'vehicles': raw['vehicle_count'].astype(np.int32)
+        })
+
+    def _emergency_frame(self, raw):
+        """Derive time features for a block of emergency rows with shared vectorized calendar features"""
+        calendar = time_features(pd.to_datetime(raw['reported_at']).to_numpy())
+
+        return pd.DataFrame({
+            'location': raw['location'].astype('category'),
+            'type': raw['incident_type'].astype('category'),
+            'severity': raw['severity'].astype(np.int8),
+            'hour': calendar['hour'],
+            'day_of_week': calendar['day_of_week'],
+            'month': calendar['month']
+        })
@@ -0,0 +1,165 @@
+"""Compact, memory-mapped store of observations and their time features.
+
+Observations are kept as one .npy file per column, sorted by (location,
+timestamp), with a per-location offsets index:
+
+    location   uint16 code into meta.json's location list
+    timestamp  datetime64[s]
+    hour, day_of_week, month, is_weekend   uint8, see utils.time_features
+    <values>   typed value columns, e.g. congestion int8 and vehicles int32
+
+A row costs 14 bytes plus its value columns (5 for traffic), so a year of
+per-minute readings for one location is about 10 MB. Columns are opened with
+mmap_mode='r', which shares them between processes through the page cache.
+Per-location and time-range reads are slices of those maps, not copies.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.time_features import time_features
+
+KEY_COLUMNS = {
+    'location': np.uint16,
+    'timestamp': 'datetime64[s]',
+    'hour': np.uint8,
+    'day_of_week': np.uint8,
+    'month': np.uint8,
+    'is_weekend': np.uint8
+}
+
+TRAFFIC_VALUES = {'congestion': np.int8, 'vehicles': np.int32}
+
+class FeatureStore:
+    def __init__(self, root, values=None):
+        self.root = root
+        self.values = dict(values or TRAFFIC_VALUES)
+        self.locations = []
+        self.location_index = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self._columns = {}
+        if os.path.exists(os.path.join(root, 'meta.json')):
+            self._open()
+
+    @property
+    def column_types(self):
+        return {**KEY_COLUMNS, **self.values}
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _open(self):
+        with open(os.path.join(self.root, 'meta.json')) as f:
+            meta = json.load(f)
+        self.values = {name: np.dtype(dtype) for name, dtype in meta['values'].items()}
+        self.locations = meta['locations']
+        self.location_index = {location: code for code, location in enumerate(self.locations)}
+        self.offsets = np.load(os.path.join(self.root, 'offsets.npy'))
+        self._columns = {
+            name: np.load(os.path.join(self.root, f'{name}.npy'), mmap_mode='r')
+            for name in self.column_types
+        }
+
+    def append(self, locations, timestamps, **values):
+        """Add observations, deriving their time features once at write time.
+
+        The store is rewritten in (location, timestamp) order, so appends cost a
+        pass over the existing data; batch them (e.g. one per BulkLoader refresh).
+        """
+        locations = np.asarray(locations, dtype=object)
+        timestamps = np.asarray(timestamps, dtype='datetime64[s]')
+        missing = set(self.values) - set(values)
+        if missing:
+            raise ValueError(f"Missing value columns: {', '.join(sorted(missing))}")
+
+        codes, uniques = pd.factorize(locations)
+        for location in uniques:
+            if location not in self.location_index:
+                self.location_index[location] = len(self.locations)
+                self.locations.append(location)
+        if len(self.locations) > np.iinfo(np.uint16).max:
+            raise ValueError("Too many locations for uint16 codes")
+        remap = np.array([self.location_index[location] for location in uniques], dtype=np.uint16)
+
+        new = {'location': remap[codes], 'timestamp': timestamps, **time_features(timestamps)}
+        for name, dtype in self.values.items():
+            new[name] = np.asarray(values[name], dtype=dtype)
+
+        columns = {
+            name: np.concatenate([self._columns[name], new[name]]) if self._columns else new[name]
+            for name in self.column_types
+        }
+
+        order = np.lexsort((columns['timestamp'], columns['location']))
+        self._write({name: column[order] for name, column in columns.items()})
+        return len(new['location'])
+
+    def _write(self, columns):
+        os.makedirs(self.root, exist_ok=True)
+        offsets = np.searchsorted(columns['location'], np.arange(len(self.locations) + 1)).astype(np.int64)
+
+        for name, column in columns.items():
+            tmp_path = os.path.join(self.root, f'{name}.tmp.npy')
+            np.save(tmp_path, column.astype(self.column_types[name], copy=False))
+            os.replace(tmp_path, os.path.join(self.root, f'{name}.npy'))
+        np.save(os.path.join(self.root, 'offsets.npy'), offsets)
+
+        # meta.json last: readers opening the store see a complete set of columns
+        tmp_meta = os.path.join(self.root, 'meta.json.tmp')
+        with open(tmp_meta, 'w') as f:
+            json.dump({
+                'locations': self.locations,
+                'values': {name: np.dtype(dtype).str for name, dtype in self.values.items()},
+                'rows': int(offsets[-1])
+            }, f, indent=2)
+        os.replace(tmp_meta, os.path.join(self.root, 'meta.json'))
+        self._open()
+
+    def column(self, name):
+        """Whole memory-mapped column"""
+        return self._columns[name]
+
+    def rows(self, location, start=None, end=None):
+        """Row range [first, last) of a location, optionally limited to start <= timestamp < end"""
+        code = self.location_index.get(location)
+        if code is None:
+            return 0, 0
+
+        first, last = int(self.offsets[code]), int(self.offsets[code + 1])
+        if start is None and end is None:
+            return first, last
+
+        # Rows of a location are sorted by timestamp, so a time range is two binary searches
+        times = self._columns['timestamp'][first:last]
+        low = np.searchsorted(times, np.datetime64(start, 's')) if start is not None else 0
+        high = np.searchsorted(times, np.datetime64(end, 's')) if end is not None else len(times)
+        return first + int(low), first + int(high)
+
+    def location(self, location, start=None, end=None, columns=None):
+        """Columns of one location's observations as zero-copy views of the memory maps"""
+        first, last = self.rows(location, start, end)
+        return {name: self._columns[name][first:last] for name in columns or self.column_types}
+
+    def matrix(self, columns, rows=None, dtype=np.float32):
+        """Feature matrix for the given columns, filled straight from the maps in one allocation.
+
+        rows is a slice or index array (default: everything). float32 matches what
+        sklearn's trees convert their input to, so fit/predict make no further copy.
+        """
+        rows = slice(None) if rows is None else rows
+        n_rows = len(self._columns['location'][rows]) if self._columns else 0
+        X = np.empty((n_rows, len(columns)), dtype=dtype)
+        for i, name in enumerate(columns):
+            X[:, i] = self._columns[name][rows]
+        return X
+
+    def frame(self, rows=None):
+        """Observations as a DataFrame over the mapped columns, location as a Categorical"""
+        if not self._columns:
+            return pd.DataFrame({name: np.array([], dtype=dtype) for name, dtype in self.column_types.items()})
+        rows = slice(None) if rows is None else rows
+        data = {name: self._columns[name][rows] for name in self.column_types}
+        data['location'] = pd.Categorical.from_codes(data['location'], self.locations)
+        return pd.DataFrame(data, copy=False)
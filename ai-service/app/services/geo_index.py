@@ -0,0 +1,117 @@
+"""Spatial index over the coordinates of known traffic locations.
+
+Models key on location names; this maps points to those names. A BallTree
+with the haversine metric answers nearest-k and radius queries in
+O(log n) per query, so a map request covering thousands of segments is one
+tree query plus one batched prediction instead of a request per segment.
+
+Coordinates come from, in increasing precedence:
+    DEFAULT_COORDINATES   locations with coordinates in database/init.sql
+    a JSON file           {"<location>": [latitude, longitude], ...}
+    the database          average latitude/longitude per location of
+                          traffic_data and iot_devices rows
+"""
+import json
+import os
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+
+# Points closer than this to a location take its prediction as is
+SNAP_METERS = 25.0
+
+DEFAULT_COORDINATES = {
+    'Central Square': (40.7589, -73.9851),
+    'Highway I-95': (40.7128, -74.0060),
+    'Shopping District': (40.7500, -73.9900),
+    'Financial District': (40.7074, -74.0113),
+    'Industrial Zone': (40.6802, -73.9481)
+}
+
+class GeoIndex:
+    def __init__(self, coordinates):
+        self.locations = sorted(coordinates)
+        self.location_index = {name: i for i, name in enumerate(self.locations)}
+        self.coordinates = np.array([coordinates[name] for name in self.locations], dtype=float).reshape(-1, 2)
+        self.tree = None
+        if self.locations:
+            # Imported here, sklearn.neighbors is only needed once coordinates are known
+            from sklearn.neighbors import BallTree
+            self.tree = BallTree(np.radians(self.coordinates), metric='haversine')
+
+    def __len__(self):
+        return len(self.locations)
+
+    @classmethod
+    def load(cls, path=None, pool=None, known=None):
+        """Index from the default, file and database coordinates, limited to `known` locations if given"""
+        coordinates = dict(DEFAULT_COORDINATES)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                coordinates.update({name: tuple(point) for name, point in json.load(f).items()})
+        if pool is not None:
+            coordinates.update(cls.database_coordinates(pool))
+        if known is not None:
+            coordinates = {name: point for name, point in coordinates.items() if name in known}
+        return cls(coordinates)
+
+    @staticmethod
+    def database_coordinates(pool):
+        """Mean coordinates per location from traffic_data and iot_devices; traffic_data wins on conflicts"""
+        coordinates = {}
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for table in ('iot_devices', 'traffic_data'):
+                    cursor.execute(
+                        f"SELECT location, AVG(latitude), AVG(longitude) FROM {table}"
+                        " WHERE latitude IS NOT NULL AND longitude IS NOT NULL GROUP BY location"
+                    )
+                    for location, latitude, longitude in cursor.fetchall():
+                        coordinates[location] = (float(latitude), float(longitude))
+            finally:
+                cursor.close()
+        return coordinates
+
+    @staticmethod
+    def _point(latitude, longitude):
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("Coordinates out of range")
+        return np.radians([[latitude, longitude]])
+
+    def nearest(self, latitude, longitude, k=1):
+        """Up to k (location, distance in meters) pairs, closest first"""
+        if self.tree is None:
+            return []
+        distances, indices = self.tree.query(self._point(latitude, longitude), k=min(k, len(self.locations)))
+        return [
+            (self.locations[i], float(d) * EARTH_RADIUS_METERS)
+            for i, d in zip(indices[0], distances[0])
+        ]
+
+    def within(self, latitude, longitude, radius_meters):
+        """Every (location, distance in meters) pair within the radius, closest first"""
+        if self.tree is None:
+            return []
+        indices, distances = self.tree.query_radius(
+            self._point(latitude, longitude), r=radius_meters / EARTH_RADIUS_METERS,
+            return_distance=True, sort_results=True
+        )
+        return [
+            (self.locations[i], float(d) * EARTH_RADIUS_METERS)
+            for i, d in zip(indices[0], distances[0])
+        ]
+
+    def coordinates_of(self, location):
+        latitude, longitude = self.coordinates[self.location_index[location]]
+        return float(latitude), float(longitude)
+
+def interpolate(values, distances, power=2):
+    """Inverse-distance weighted mean; a distance under SNAP_METERS returns that value"""
+    values = np.asarray(values, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    if distances[0] < SNAP_METERS:
+        return float(values[0])
+    weights = 1.0 / distances ** power
+    return float(np.dot(weights, values) / weights.sum())
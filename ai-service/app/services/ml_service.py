@@ -1,26 +1,75 @@
-from .traffic_predictor import AdvancedTrafficModel
-from .anomaly_detector import AnomalyDetector
-from .emergency_predictor import EmergencyPredictor
-from .data_processor import DataProcessor
+import numpy as np
+
+from models.traffic_predictor import AdvancedTrafficModel
+from models.anomaly_detector import AnomalyDetector
+from models.emergency_predictor import EmergencyPredictor
+from services.data_processor import DataProcessor
+from services.model_registry import ModelNotFound
+from services.training import cores_per_job, train_models
+
+# Service attribute -> model registry name
+REGISTRY_NAMES = {
+    'traffic_model': 'advanced',
+    'anomaly_detector': 'anomaly',
+    'emergency_predictor': 'emergency'
+}
 
 class MLService:
-    def __init__(self):
+    def __init__(self, registry=None, district=None):
         self.traffic_model = AdvancedTrafficModel()
         self.anomaly_detector = AnomalyDetector()
         self.emergency_predictor = EmergencyPredictor()
         self.data_processor = DataProcessor()
+        self.registry = registry
+        self.district = district
+    
+    def load_models(self):
+        """Take the latest registered version of every model the registry has for this district"""
+        loaded = []
+        for name, registry_name in REGISTRY_NAMES.items():
+            try:
+                setattr(self, name, self.registry.get(registry_name, district=self.district))
+                loaded.append(name)
+            except ModelNotFound:
+                print(f"No registered {registry_name} model for district {self.district or 'default'}")
+        return loaded
+        
+    def initialize_models(self, emergency_data=None, sensor_data=None, max_workers=None, n_jobs=None):
+        """Initialize all ML models, training independent ones concurrently.
         
-    def initialize_models(self):
-        """Initialize all ML models"""
+        Anomaly detector and emergency predictor are only trained when their
+        historical data is supplied. n_jobs sets the per-estimator core count
+        (default: cores split evenly between models). Trained models are
+        registered as new versions when the service has a registry. Returns
+        per-model wall times.
+        """
         print("Initializing ML models...")
         
-        # Train traffic model
-        self.traffic_model.train()
+        training_sets = {'traffic_model': (AdvancedTrafficModel, ())}
+        if emergency_data is not None:
+            training_sets['emergency_predictor'] = (EmergencyPredictor, (emergency_data,))
+        if sensor_data is not None:
+            training_sets['anomaly_detector'] = (AnomalyDetector, (sensor_data,))
         
-        # Note: Anomaly detector and emergency predictor would be trained
-        # with real data in a production environment
+        n_jobs = n_jobs or cores_per_job(len(training_sets))
+        jobs = {
+            name: (model_class(n_jobs=n_jobs), 'train', args)
+            for name, (model_class, args) in training_sets.items()
+        }
+        
+        timings = {}
+        for name, result in train_models(jobs, max_workers=max_workers).items():
+            if result['trained']:
+                setattr(self, name, result['model'])
+                if self.registry is not None:
+                    self.registry.register(
+                        REGISTRY_NAMES[name], result['model'], {'train_seconds': result['seconds']}, district=self.district
+                    )
+            timings[name] = result['seconds']
+            print(f"{name}: trained={result['trained']} in {result['seconds']}s")
         
         print("ML models initialized successfully!")
+        return timings
     
     def predict_traffic(self, location, time_data=None):
         """Predict traffic conditions"""
@@ -36,3 +85,15 @@ class MLService:
             location, emergency_type, 
             time_data['hour'], time_data['day_of_week'], time_data['month']
         )
+    
+    def rank_emergency_risk(self, incidents):
+        """Score every open emergency_incidents row in one batch, highest severe risk first"""
+        incidents = list(incidents)
+        if not incidents:
+            return []
+        
+        risks = self.emergency_predictor.predict_batch(
+            self.data_processor.process_emergency_data(incidents)
+        )
+        order = np.argsort(-risks, kind='stable')
+        return [{**incidents[i], 'risk': round(float(risks[i]), 4)} for i in order]
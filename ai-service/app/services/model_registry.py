@@ -0,0 +1,208 @@
+"""Versioned model store with lazy, memory-bounded loading.
+
+Layout under the registry root, one directory per model, district and version:
+
+    <root>/<name>/<district>/<version>/model.joblib
+    <root>/<name>/<district>/<version>/manifest.json
+
+The manifest records the version, feature schema, training metrics, size and
+SHA-256 checksum of model.joblib. Nothing is loaded until a model is first
+requested; loaded models are kept in an LRU that unloads the least recently
+used ones once their artifact sizes exceed the memory budget. The latest
+version of each model and district is cached too, so serving it costs no
+directory listing; the cache is dropped on register() and invalidate(), and
+otherwise re-read every latest_ttl seconds to see versions other processes add.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import joblib
+
+from models.flat_forest import compile_if_enabled
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISTRICT = 'default'
+MODEL_FILE = 'model.joblib'
+MANIFEST_FILE = 'manifest.json'
+
+def _sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelNotFound(KeyError):
+    """No registered model matches the requested name, district and version"""
+
+class ModelRegistry:
+    def __init__(self, root='models/registry', memory_budget_mb=None, latest_ttl=None):
+        self.root = root
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.environ.get('AI_MODEL_MEMORY_BUDGET_MB', 1024))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        if latest_ttl is None:
+            latest_ttl = float(os.environ.get('AI_REGISTRY_LATEST_TTL', 30))
+        self.latest_ttl = latest_ttl
+        # (name, district) -> (latest version, time.monotonic() when it was resolved)
+        self._latest = {}
+        self._loaded = OrderedDict()
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def _model_dir(self, name, district=None, version=None):
+        path = os.path.join(self.root, name, district or DEFAULT_DISTRICT)
+        return os.path.join(path, version) if version else path
+
+    def register(self, name, model, metrics=None, schema=None, district=None):
+        """Persist a trained model as a new version and return its manifest"""
+        version = getattr(model, 'version', None) or datetime.now().strftime('%Y%m%d%H%M%S')
+        base_version, suffix = version, 1
+        while os.path.exists(self._model_dir(name, district, version)):
+            version = f"{base_version}-{suffix}"
+            suffix += 1
+
+        path = self._model_dir(name, district, version)
+        tmp_path = path + '.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+
+        # The flat export is rebuilt on load, it depends on the serving backend
+        artifact = copy.copy(model)
+        artifact.version = version
+        if getattr(artifact, 'flat_model', None) is not None:
+            artifact.flat_model = None
+        model_file = os.path.join(tmp_path, MODEL_FILE)
+        joblib.dump(artifact, model_file)
+
+        manifest = {
+            'name': name,
+            'district': district or DEFAULT_DISTRICT,
+            'version': version,
+            'model_class': type(model).__name__,
+            'schema': schema if schema is not None else getattr(model, 'features', None),
+            'metrics': metrics or {},
+            'size_bytes': os.path.getsize(model_file),
+            'checksum': _sha256(model_file),
+            'created_at': datetime.now().isoformat()
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        # A version directory only becomes visible once it is complete
+        os.replace(tmp_path, path)
+        self.invalidate(name)
+        logger.info(f"Registered {name} model {version} for district {manifest['district']}")
+        return manifest
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(entry for entry in os.listdir(self.root) if self.districts(entry))
+
+    def versions(self, name, district=None):
+        """Registered versions of a model, oldest first"""
+        path = self._model_dir(name, district)
+        if not os.path.isdir(path):
+            return []
+        return sorted(
+            entry for entry in os.listdir(path)
+            if os.path.isfile(os.path.join(path, entry, MANIFEST_FILE))
+        )
+
+    def districts(self, name):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(path):
+            return []
+        return sorted(entry for entry in os.listdir(path) if self.versions(name, entry))
+
+    def manifest(self, name, version=None, district=None):
+        """Manifest of a version, the latest one when version is None"""
+        version = self._resolve(name, version, district)
+        with open(os.path.join(self._model_dir(name, district, version), MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def _resolve(self, name, version=None, district=None):
+        """Check a requested version against the registered ones; None means the latest"""
+        if district is not None and district not in self.districts(name):
+            raise ModelNotFound(f"{name}/{district}")
+        versions = self.versions(name, district)
+        if version is None and versions:
+            return versions[-1]
+        if version not in versions:
+            raise ModelNotFound(f"{name}/{district or DEFAULT_DISTRICT}/{version or 'latest'}")
+        return version
+
+    def _latest_version(self, name, district=None):
+        """Latest registered version, from the cache while it is fresh"""
+        key = (name, district or DEFAULT_DISTRICT)
+        cached = self._latest.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.latest_ttl:
+            return cached[0]
+
+        version = self._resolve(name, None, district)
+        self._latest[key] = (version, time.monotonic())
+        return version
+
+    def invalidate(self, name=None):
+        """Forget cached latest versions (all of them, or name's), e.g. after a reload"""
+        with self._lock:
+            for key in [key for key in self._latest if name is None or key[0] == name]:
+                del self._latest[key]
+
+    def get(self, name, version=None, district=None):
+        """Model for name and district, pinned to version or the latest, loaded on first use"""
+        # Loaded models are found without touching the filesystem
+        if version is None:
+            version = self._latest_version(name, district)
+        key = (name, district or DEFAULT_DISTRICT, version)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key][0]
+
+        manifest = self.manifest(name, version, district)
+        model_file = os.path.join(self._model_dir(name, district, version), MODEL_FILE)
+        if _sha256(model_file) != manifest['checksum']:
+            raise ValueError(f"Checksum mismatch for {'/'.join(key)}")
+
+        # Arrays stay on disk and are shared between workers through the page cache
+        model = joblib.load(model_file, mmap_mode='r')
+        if hasattr(model, 'flat_model'):
+            model.flat_model = compile_if_enabled(model.model)
+        logger.info(f"Loaded {'/'.join(key)} from the model registry")
+
+        with self._lock:
+            if key not in self._loaded:
+                self._loaded[key] = (model, manifest['size_bytes'])
+                self._loaded_bytes += manifest['size_bytes']
+                self._evict()
+            return self._loaded[key][0]
+
+    def _evict(self):
+        """Unload least recently used models until the budget holds, always keeping the newest"""
+        while self._loaded_bytes > self.memory_budget and len(self._loaded) > 1:
+            key, (_, size) = self._loaded.popitem(last=False)
+            self._loaded_bytes -= size
+            logger.info(f"Unloaded {'/'.join(key)} from the model registry")
+
+    def unload(self, name=None):
+        """Drop loaded models (all of them, or every version of name)"""
+        with self._lock:
+            for key in [key for key in self._loaded if name is None or key[0] == name]:
+                self._loaded_bytes -= self._loaded.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': ['/'.join(key) for key in self._loaded],
+                'loaded_bytes': self._loaded_bytes,
+                'memory_budget_bytes': self.memory_budget
+            }
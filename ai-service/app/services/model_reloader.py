@@ -0,0 +1,113 @@
+"""Hot reload of serving models from their artifacts, without a restart.
+
+A reload builds a fresh model instance, loads the artifact into it and runs
+its canary() check, all while requests keep using the current instance.
+Only a model that passes is handed to the slot's swap function. That
+function rebinds the reference new requests read and purges the responses
+cached from the old model; in-flight requests finish on the old one. A
+failed load or canary leaves the current model serving.
+
+watch() polls artifact modification times, so every worker process picks
+up an artifact written by train.py or by another worker.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ReloadInProgress(Exception):
+    pass
+
+class ModelReloader:
+    def __init__(self, swap_lock=None):
+        self.slots = {}
+        self._lock = threading.Lock()
+        # Shared with other writers of the serving models so swaps never interleave
+        self.swap_lock = swap_lock or threading.Lock()
+
+    def register(self, name, factory, current, swap):
+        """Reload `name` by loading factory()'s artifact; current() is the serving model, swap(model) installs one"""
+        self.slots[name] = {
+            'factory': factory,
+            'current': current,
+            'swap': swap,
+            'mtime': self._mtime(current().model_path)
+        }
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def mark_current(self, name):
+        """Record the artifact as already serving, e.g. after this process saved it itself"""
+        slot = self.slots[name]
+        slot['mtime'] = self._mtime(slot['current']().model_path)
+
+    def reload(self, name):
+        """Load, check and swap in the model's artifact; returns a status dict.
+
+        Raises KeyError for unknown names and ReloadInProgress when another
+        reload is running.
+        """
+        slot = self.slots[name]
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress(name)
+
+        try:
+            started = time.perf_counter()
+            path = slot['current']().model_path
+            mtime = self._mtime(path)
+            candidate = slot['factory']()
+            candidate.model_path = path
+
+            if not candidate.load_model():
+                return {"model": name, "status": "failed", "reason": f"Could not load {path}"}
+            try:
+                checked = candidate.canary()
+            except Exception as e:
+                logger.error(f"Canary check of {name} model from {path} failed: {str(e)}")
+                return {"model": name, "status": "failed", "reason": f"Canary check failed: {str(e)}"}
+
+            with self.swap_lock:
+                slot['swap'](candidate)
+                slot['mtime'] = mtime
+            logger.info(f"Reloaded {name} model {getattr(candidate, 'version', None)} from {path}")
+            return {
+                "model": name,
+                "status": "reloaded",
+                "version": getattr(candidate, 'version', None),
+                "canary_rows": checked,
+                "seconds": round(time.perf_counter() - started, 3)
+            }
+        finally:
+            self._lock.release()
+
+    def changed(self):
+        """Names of models whose artifact changed since it was last loaded"""
+        changed = []
+        for name, slot in self.slots.items():
+            mtime = self._mtime(slot['current']().model_path)
+            if mtime is not None and mtime != slot['mtime']:
+                changed.append(name)
+        return changed
+
+    def watch(self, interval):
+        """Reload models whose artifact changes, checking every `interval` seconds; never returns"""
+        while True:
+            time.sleep(interval)
+            for name in self.changed():
+                try:
+                    result = self.reload(name)
+                except ReloadInProgress:
+                    continue
+                except Exception as e:
+                    logger.error(f"Error reloading {name} model: {str(e)}")
+                    continue
+                if result['status'] == 'failed':
+                    # Retried on the next change; a half-written artifact gets a new mtime when finished
+                    self.slots[name]['mtime'] = self._mtime(self.slots[name]['current']().model_path)
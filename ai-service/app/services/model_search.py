@@ -0,0 +1,114 @@
+"""Hyperparameter search for the advanced traffic forest, scored on accuracy and serving cost.
+
+Every candidate is cross-validated with TimeSeriesSplit over rows in time
+order, so each fold trains on the past and is scored on the period right
+after it. Alongside RMSE and MAE, a candidate records its size (tree nodes
+and pickled bytes) and its single-row and per-row batch prediction latency.
+Candidates run in a process pool; the training matrix is sent to each
+worker once, through the pool initializer.
+
+select() then picks the cheapest forest whose RMSE meets the target. The
+target is either absolute or within a tolerance of the best candidate.
+"""
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import TimeSeriesSplit
+
+# Candidate grid: from the current default (200 trees, depth 15) down to small, shallow forests
+SEARCH_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [6, 8, 10, 12, 15],
+    'min_samples_split': [5]
+}
+
+# Rows per latency measurement batch
+LATENCY_BATCH = 1000
+
+_data = {}
+
+def _init_worker(X, y):
+    _data['X'], _data['y'] = X, y
+
+def candidates(grid=None):
+    """Every combination of the grid's values as a hyperparameter dict"""
+    grid = grid or SEARCH_GRID
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def _latency_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1000
+
+def evaluate(params, n_splits=5, latency_repeats=50):
+    """Cross-validated accuracy, size and latency of one candidate on the worker's data"""
+    X, y = _data['X'], _data['y']
+    rmse, mae = [], []
+    started = time.perf_counter()
+
+    for train_index, test_index in TimeSeriesSplit(n_splits=n_splits).split(X):
+        model = RandomForestRegressor(**params, random_state=42, n_jobs=1)
+        model.fit(X[train_index], y[train_index])
+        errors = model.predict(X[test_index]) - y[test_index]
+        rmse.append(float(np.sqrt(np.mean(errors ** 2))))
+        mae.append(float(np.mean(np.abs(errors))))
+
+    # Size and latency of the forest fitted on the largest training window
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    batch = X[:LATENCY_BATCH]
+
+    return {
+        'params': params,
+        'rmse': round(float(np.mean(rmse)), 4),
+        'rmse_std': round(float(np.std(rmse)), 4),
+        'mae': round(float(np.mean(mae)), 4),
+        'nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+        'size_bytes': buffer.tell(),
+        'predict_1_ms': round(_latency_ms(lambda: model.predict(batch[:1]), latency_repeats), 4),
+        'predict_batch_per_row_us': round(
+            _latency_ms(lambda: model.predict(batch), max(3, latency_repeats // 10)) * 1000 / len(batch), 4),
+        'cv_seconds': round(time.perf_counter() - started, 3)
+    }
+
+def search(X, y, grid=None, n_splits=5, max_workers=None):
+    """Evaluate every grid candidate in a process pool; results sorted by RMSE"""
+    params = candidates(grid)
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(X, y)) as pool:
+        futures = {pool.submit(evaluate, p, n_splits): p for p in params}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Error evaluating {futures[future]}: {str(e)}")
+
+    return sorted(results, key=lambda result: result['rmse'])
+
+def select(results, target_rmse=None, tolerance=0.05):
+    """Smallest forest (fewest nodes, then lowest latency) meeting the RMSE target.
+
+    Without an explicit target, the target is the best RMSE plus `tolerance`
+    (relative). Returns (selected result, target), or (None, target) if none qualify.
+    """
+    if not results:
+        return None, target_rmse
+    if target_rmse is None:
+        target_rmse = round(min(result['rmse'] for result in results) * (1 + tolerance), 4)
+
+    eligible = [result for result in results if result['rmse'] <= target_rmse]
+    if not eligible:
+        return None, target_rmse
+    return min(eligible, key=lambda result: (result['nodes'], result['predict_1_ms'])), target_rmse
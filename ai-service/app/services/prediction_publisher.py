@@ -0,0 +1,164 @@
+"""Precomputed predictions, published to the ai_predictions table and a snapshot file.
+
+One run evaluates every model once over its whole grid:
+
+    TRAFFIC    per location, hourly congestion for the next `hours` hours
+               (one gather over the advanced model's location x hour table)
+    EMERGENCY  per (location, incident type), hourly severe-incident risk
+               over the same horizon (one predict_proba call)
+    TREND      the trend engine's snapshot
+
+Rows are written with one executemany per run and carry the validity window
+of their series; readers pick the newest row still valid instead of calling
+the AI service. The same payload goes to a JSON snapshot file, replaced
+atomically, for readers without database access.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import hour_bucket
+from utils.time_features import time_features
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_TYPES = ('TRAFFIC', 'EMERGENCY', 'TREND')
+
+# Severe-incident probability thresholds of the published risk levels
+RISK_LEVELS = ((0.7, 'HIGH'), (0.4, 'MEDIUM'), (0.0, 'LOW'))
+
+def risk_level(probability):
+    for threshold, level in RISK_LEVELS:
+        if probability >= threshold:
+            return level
+    return RISK_LEVELS[-1][1]
+
+class PredictionPublisher:
+    def __init__(self, pool=None, snapshot_path='models/predictions_snapshot.json', hours=24):
+        self.pool = pool
+        self.snapshot_path = snapshot_path
+        self.hours = hours
+
+    def traffic(self, model, start):
+        """(prediction_data, confidence) per location for the horizon starting at `start`"""
+        locations, _, congestion = model.forecast(None, self.hours, start)
+        if not locations:
+            return []
+
+        # Same heuristic as AdvancedTrafficModel.predict: confidence drops as predictions fall between levels
+        confidence = np.clip(1 - np.abs(congestion - np.rint(congestion)) * 2, 0.7, 0.95).mean(axis=1)
+        levels = np.clip(np.rint(congestion), 1, 10).astype(int)
+        return [
+            ({"location": location, "congestion": row.tolist(), "peak_congestion": int(row.max())}, float(c) * 100)
+            for location, row, c in zip(locations, levels, confidence)
+        ]
+
+    def emergency(self, model, start):
+        """(prediction_data, confidence) per known (location, incident type) for the horizon"""
+        if model is None or not model.is_trained:
+            return []
+
+        locations = list(model.location_index)
+        types = list(model.type_index)
+        calendar = time_features(pd.date_range(start, periods=self.hours, freq='h').to_numpy())
+
+        # (location, type, hour) grid in one frame and one predict_proba call
+        n_pairs = len(locations) * len(types)
+        frame = pd.DataFrame({
+            'location': pd.Categorical.from_codes(np.repeat(np.arange(len(locations)), len(types) * self.hours), locations),
+            'type': pd.Categorical.from_codes(np.tile(np.repeat(np.arange(len(types)), self.hours), len(locations)), types),
+            'hour': np.tile(calendar['hour'], n_pairs),
+            'day_of_week': np.tile(calendar['day_of_week'], n_pairs),
+            'month': np.tile(calendar['month'], n_pairs)
+        })
+        risk = model.predict_batch(frame).reshape(len(locations), len(types), self.hours)
+
+        # The forest's probability for the outcome it predicts (severe or not), averaged over the horizon
+        confidence = np.maximum(risk, 1 - risk).mean(axis=2)
+
+        rows = []
+        for i, location in enumerate(locations):
+            for j, incident_type in enumerate(types):
+                series = np.round(risk[i, j], 3)
+                rows.append(({
+                    "location": location,
+                    "type": incident_type,
+                    "risk": series.tolist(),
+                    "risk_level": risk_level(float(series.max()))
+                }, float(confidence[i, j]) * 100))
+        return rows
+
+    def publish(self, traffic_model, emergency_model=None, trend_engine=None, now=None):
+        """Compute and write one round of predictions; returns the number of rows per type"""
+        generated_at = (now or datetime.now()).replace(microsecond=0)
+        start = hour_bucket(generated_at)
+        valid_until = start + timedelta(hours=self.hours)
+        header = {"start": start.isoformat(), "hours": self.hours}
+
+        predictions = {
+            'TRAFFIC': [({**header, **data}, confidence) for data, confidence in self.traffic(traffic_model, start)],
+            'EMERGENCY': [({**header, **data}, confidence) for data, confidence in self.emergency(emergency_model, start)]
+        }
+        if trend_engine is not None:
+            if self.pool is not None:
+                trend_engine.poll(self.pool)
+            # Trends describe the present, they are valid until the next hour
+            predictions['TREND'] = [(trend_engine.snapshot(generated_at), 100.0)]
+
+        rows = []
+        for prediction_type, entries in predictions.items():
+            until = start + timedelta(hours=1) if prediction_type == 'TREND' else valid_until
+            for data, confidence in entries:
+                rows.append((prediction_type, data, round(confidence, 2), generated_at, until))
+
+        if self.pool is not None:
+            self._insert(rows, generated_at)
+        if self.snapshot_path:
+            self._write_snapshot(rows, generated_at)
+
+        counts = {prediction_type: len(entries) for prediction_type, entries in predictions.items()}
+        logger.info(f"Published predictions {counts} valid until {valid_until.isoformat()}")
+        return counts
+
+    def _insert(self, rows, generated_at):
+        p = self.pool.placeholder
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(
+                    "INSERT INTO ai_predictions (prediction_type, prediction_data, confidence, generated_at, valid_until)"
+                    f" VALUES ({p}, {p}, {p}, {p}, {p})",
+                    [(t, json.dumps(data), confidence, self._sql_time(g), self._sql_time(v)) for t, data, confidence, g, v in rows]
+                )
+                # Expired rows of the published types are superseded by this round
+                cursor.execute(
+                    f"DELETE FROM ai_predictions WHERE valid_until < {p}"
+                    f" AND prediction_type IN ({', '.join([p] * len(PREDICTION_TYPES))})",
+                    (self._sql_time(generated_at),) + PREDICTION_TYPES
+                )
+                connection.commit()
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _sql_time(value):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _write_snapshot(self, rows, generated_at):
+        snapshot = {"generated_at": generated_at.isoformat()}
+        for prediction_type, data, confidence, _, valid_until in rows:
+            snapshot.setdefault(prediction_type.lower(), []).append({
+                **data,
+                "confidence": confidence,
+                "valid_until": valid_until.isoformat()
+            })
+
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
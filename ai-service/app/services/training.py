@@ -0,0 +1,44 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+def _train_job(model, method, args):
+    """Train one model inside a pool worker and ship it back with its wall time"""
+    started = time.perf_counter()
+    getattr(model, method)(*args)
+    return model, time.perf_counter() - started
+
+def cores_per_job(n_jobs_total):
+    """Split the machine's cores evenly between concurrently trained models"""
+    return max(1, (os.cpu_count() or 1) // max(1, n_jobs_total))
+
+def train_models(jobs, max_workers=None):
+    """Fit independent models concurrently in a process pool.
+
+    jobs maps a name to (model, training method name, args). Returns a dict mapping
+    each name to {'model': trained model, 'trained': bool, 'seconds': wall time}.
+    """
+    results = {}
+    if not jobs:
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(jobs)) as pool:
+        futures = {
+            pool.submit(_train_job, model, method, args): name
+            for name, (model, method, args) in jobs.items()
+        }
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                model, seconds = future.result()
+                results[name] = {
+                    'model': model,
+                    'trained': model.is_trained,
+                    'seconds': round(seconds, 3)
+                }
+            except Exception as e:
+                print(f"Error training {name} model: {str(e)}")
+                results[name] = {'model': None, 'trained': False, 'seconds': None}
+
+    return results
@@ -0,0 +1,296 @@
+"""Incremental trend analysis over city_operations, emergency_incidents and system_metrics.
+
+Every event updates fixed-size state in O(1): a ring of per-bucket counts and
+sums over the trailing window, and a Holt (double exponential) smoothing of
+the per-bucket event rate whose trend term is the EWMA slope. Buckets are
+closed lazily when time moves past them, at most one window's worth at a
+time, so reading a snapshot is also constant time for a fixed set of
+operation types and never rescans history.
+"""
+import threading
+import time
+from datetime import datetime
+
+# Activity in the trailing window that counts as critical
+CRITICAL_SEVERITY = 4
+
+# Slope, in events per bucket, beyond which a type counts as rising or falling
+SLOPE_THRESHOLD = 0.25
+
+RECOMMENDATIONS = {
+    'TRAFFIC': "Deploy additional traffic control units to downtown area",
+    'UTILITY': "Schedule utility maintenance during off-peak hours",
+    'EMERGENCY': "Monitor weather conditions for potential emergency response needs",
+    'SECURITY': "Increase security patrols in affected districts"
+}
+
+def _epoch(value):
+    """Seconds since the epoch for datetimes, ISO strings, numbers or None (now)"""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+class RollingWindow:
+    """Counts and value sums in fixed time buckets over a trailing window"""
+
+    def __init__(self, window_seconds, bucket_seconds, alpha=0.3, beta=0.1):
+        self.bucket_seconds = bucket_seconds
+        self.n_buckets = max(1, int(window_seconds // bucket_seconds))
+        self.counts = [0] * self.n_buckets
+        self.sums = [0.0] * self.n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.current = None
+        # Holt smoothing of closed-bucket counts
+        self.alpha = alpha
+        self.beta = beta
+        self.level = None
+        self.slope = 0.0
+
+    def _advance(self, bucket):
+        """Close every bucket before `bucket`, at most n_buckets steps however long the gap"""
+        if self.current is None:
+            self.current = bucket
+            return
+
+        for _ in range(min(bucket - self.current, self.n_buckets)):
+            self._close(self.counts[self.current % self.n_buckets])
+            self.current += 1
+            slot = self.current % self.n_buckets
+            self.count -= self.counts[slot]
+            self.total -= self.sums[slot]
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+        if bucket > self.current:
+            # Gap longer than the window: the skipped buckets were all empty
+            for _ in range(min(bucket - self.current, self.n_buckets)):
+                self._close(0)
+            self.current = bucket
+
+    def _close(self, observed):
+        if self.level is None:
+            self.level = float(observed)
+            return
+        previous = self.level
+        self.level = self.alpha * observed + (1 - self.alpha) * (previous + self.slope)
+        self.slope = self.beta * (self.level - previous) + (1 - self.beta) * self.slope
+
+    def add(self, timestamp, value=0.0):
+        bucket = int(timestamp // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self.current - self.n_buckets:
+            return  # Older than the window
+        slot = bucket % self.n_buckets
+        self.counts[slot] += 1
+        self.sums[slot] += value
+        self.count += 1
+        self.total += value
+
+    def at(self, timestamp):
+        self._advance(int(timestamp // self.bucket_seconds))
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+class TrendEngine:
+    def __init__(self, window_seconds=24 * 3600, bucket_seconds=3600):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.operations = {}
+        self.critical = {}
+        self.incidents = self._window()
+        self.response_times = self._window()
+        self.metrics = {}
+        self.watermarks = {}
+        self._lock = threading.Lock()
+
+    def _window(self):
+        return RollingWindow(self.window_seconds, self.bucket_seconds)
+
+    def record_operation(self, operation_type, severity, timestamp=None):
+        """One city_operations row"""
+        at = _epoch(timestamp)
+        severity = float(severity)
+        with self._lock:
+            if operation_type not in self.operations:
+                self.operations[operation_type] = self._window()
+                self.critical[operation_type] = self._window()
+            self.operations[operation_type].add(at, severity)
+            if severity >= CRITICAL_SEVERITY:
+                self.critical[operation_type].add(at)
+
+    def record_incident(self, severity, reported_at=None, resolved_at=None):
+        """One emergency_incidents row; resolved ones also feed the response time average"""
+        with self._lock:
+            self.incidents.add(_epoch(reported_at), float(severity))
+        if resolved_at is not None:
+            self.record_resolution(reported_at, resolved_at)
+
+    def record_resolution(self, reported_at, resolved_at):
+        """Response time of an emergency_incidents row, once it is resolved"""
+        reported, resolved = _epoch(reported_at), _epoch(resolved_at)
+        with self._lock:
+            self.response_times.add(resolved, max(0.0, resolved - reported))
+
+    def record_metric(self, name, value, recorded_at=None):
+        """One system_metrics row"""
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = self._window()
+            self.metrics[name].add(_epoch(recorded_at), float(value))
+
+    def ingest(self, operations=(), incidents=(), metrics=()):
+        """Apply rows shaped like the database tables; returns how many were applied"""
+        applied = 0
+        for row in operations:
+            self.record_operation(row['operation_type'], row['severity'], row.get('timestamp'))
+            applied += 1
+        for row in incidents:
+            self.record_incident(row['severity'], row.get('reported_at'), row.get('resolved_at'))
+            applied += 1
+        for row in metrics:
+            self.record_metric(row['metric_name'], row['metric_value'], row.get('recorded_at'))
+            applied += 1
+        return applied
+
+    def poll(self, pool, since=None):
+        """Ingest rows added to the three tables since the last poll, tracked by id,
+        and incidents resolved since the last poll, tracked by (resolved_at, id).
+
+        The first poll only reads the trailing window (from `since`, default
+        now - window), so starting up never scans the whole history. Rows are
+        applied in time order, as the smoothing expects.
+        """
+        since = since if since is not None else datetime.fromtimestamp(time.time() - self.window_seconds)
+        since = since.strftime('%Y-%m-%d %H:%M:%S')
+        queries = {
+            'city_operations': ('operation_type, severity, timestamp', 'timestamp', self.record_operation),
+            # Resolution is an update, not a new row, so response times are polled separately below
+            'emergency_incidents': ('severity, reported_at', 'reported_at', self.record_incident),
+            'system_metrics': ('metric_name, metric_value, recorded_at', 'recorded_at', self.record_metric)
+        }
+
+        applied = 0
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for table, (columns, time_column, record) in queries.items():
+                    applied += self._poll_new(cursor, pool.placeholder, table, columns, time_column, record, since)
+                applied += self._poll_resolved(cursor, pool.placeholder, since)
+            finally:
+                cursor.close()
+        return applied
+
+    def _poll_new(self, cursor, placeholder, table, columns, time_column, record, since):
+        last_id = self.watermarks.get(table)
+        if last_id is None:
+            # Bound the window read by the current max id, later rows are picked up by id
+            cursor.execute(f"SELECT MAX(id) FROM {table}")
+            max_id = cursor.fetchone()[0] or 0
+            cursor.execute(
+                f"SELECT id, {columns} FROM {table}"
+                f" WHERE {time_column} >= {placeholder} AND id <= {placeholder} ORDER BY {time_column}, id",
+                (since, max_id)
+            )
+        else:
+            cursor.execute(
+                f"SELECT id, {columns} FROM {table} WHERE id > {placeholder} ORDER BY {time_column}, id",
+                (last_id,)
+            )
+            max_id = last_id
+        rows = cursor.fetchall()
+        for row in rows:
+            record(*row[1:])
+            max_id = max(max_id, row[0])
+        self.watermarks[table] = max_id
+        return len(rows)
+
+    def _poll_resolved(self, cursor, placeholder, since):
+        resolved_at, last_id = self.watermarks.get('resolved', (since, 0))
+        cursor.execute(
+            "SELECT id, reported_at, resolved_at FROM emergency_incidents"
+            f" WHERE resolved_at > {placeholder} OR (resolved_at = {placeholder} AND id > {placeholder})"
+            " ORDER BY resolved_at, id",
+            (resolved_at, resolved_at, last_id)
+        )
+        rows = cursor.fetchall()
+        for _, reported_at, resolved in rows:
+            self.record_resolution(reported_at, resolved)
+        if rows:
+            self.watermarks['resolved'] = (rows[-1][2], rows[-1][0])
+        return len(rows)
+
+    def snapshot(self, now=None):
+        """Current aggregates, alerts and recommendations; constant time"""
+        at = _epoch(now)
+        hours = self.window_seconds // 3600
+
+        with self._lock:
+            operations = {}
+            for operation_type, window in sorted(self.operations.items()):
+                window.at(at)
+                critical = self.critical[operation_type].at(at)
+                operations[operation_type] = {
+                    "count": window.count,
+                    "critical": critical.count,
+                    "mean_severity": round(window.mean, 2) if window.mean is not None else None,
+                    "slope_per_hour": round(window.slope * 3600 / self.bucket_seconds, 3) or 0.0,
+                    "trend": self._direction(window.slope)
+                }
+
+            incidents = self.incidents.at(at)
+            response_times = self.response_times.at(at)
+            system = {}
+            for name, window in sorted(self.metrics.items()):
+                window.at(at)
+                system[name] = round(window.mean, 2) if window.mean is not None else None
+
+            total_slope = sum(window.slope for window in self.operations.values())
+            total_incidents = incidents.count
+            mean_response = response_times.mean
+
+        alerts = []
+        for operation_type, summary in operations.items():
+            if summary["critical"]:
+                alerts.append({
+                    "type": operation_type,
+                    "level": "critical" if summary["trend"] == "increasing" else "warning",
+                    "message": f"{summary['critical']} critical {operation_type.lower()} events in the last {hours}h"
+                               f" ({summary['trend']})"
+                })
+            elif summary["trend"] == "increasing":
+                alerts.append({
+                    "type": operation_type,
+                    "level": "info",
+                    "message": f"{operation_type.title()} activity rising by {summary['slope_per_hour']} events/hour"
+                })
+
+        return {
+            "overall_trend": self._direction(total_slope),
+            "alerts": alerts,
+            "recommendations": [
+                RECOMMENDATIONS[alert["type"]] for alert in alerts if alert["type"] in RECOMMENDATIONS
+            ],
+            "operations": operations,
+            "metrics": {
+                f"total_incidents_last_{hours}h": total_incidents,
+                "average_response_time": f"{round(mean_response / 60)} minutes" if mean_response is not None else None,
+                "system": system
+            },
+            "window_hours": hours,
+            "generated_at": datetime.fromtimestamp(at).isoformat()
+        }
+
+    @staticmethod
+    def _direction(slope):
+        if slope > SLOPE_THRESHOLD:
+            return "increasing"
+        if slope < -SLOPE_THRESHOLD:
+            return "decreasing"
+        return "stable"
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from utils.metrics import CACHE_ENTRIES, CACHE_HITS, CACHE_MISSES
+
+def hour_bucket(now):
+    """Start of the hour containing now, the finest granularity the traffic models see"""
+    return now.replace(minute=0, second=0, microsecond=0)
+
+def next_hour(now):
+    """Start of the hour following now"""
+    return hour_bucket(now) + timedelta(hours=1)
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire at an absolute deadline.
+
+    Hits, misses and the entry count are exported under the cache=name label.
+    """
+
+    def __init__(self, max_size=4096, name='default'):
+        self.max_size = max_size
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count_entries(self):
+        CACHE_ENTRIES.set(len(self._entries), cache=self.name)
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    CACHE_HITS.inc(cache=self.name)
+                    return value
+                del self._entries[key]
+                self._count_entries()
+            CACHE_MISSES.inc(cache=self.name)
+            return None
+
+    def set(self, key, value, expires_at):
+        """Store value until the epoch timestamp expires_at, evicting least recently used entries"""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._count_entries()
+
+    def clear(self):
+        """Drop every entry, e.g. after the model behind the responses changed"""
+        with self._lock:
+            self._entries.clear()
+            self._count_entries()
+
+    def discard(self, predicate):
+        """Drop the entries whose key satisfies predicate, e.g. those built by one model"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+            self._count_entries()
+
+    def __len__(self):
+        return len(self._entries)
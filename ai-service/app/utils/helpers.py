@@ -1,25 +1,36 @@
 import json
+import os
 from datetime import datetime
 
+import joblib
+
 def json_serializer(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, datetime):
         return obj.isoformat()
     raise TypeError(f"Type {type(obj)} not serializable")
 
-def save_model_metrics(model_name, metrics):
+def save_model_metrics(model_name, metrics, directory='models'):
     """Save model metrics to file"""
     try:
-        with open(f'models/{model_name}_metrics.json', 'w') as f:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f'{model_name}_metrics.json'), 'w') as f:
             json.dump(metrics, f, default=json_serializer, indent=2)
     except Exception as e:
         print(f"Error saving model metrics: {str(e)}")
 
-def load_model_metrics(model_name):
+def load_model_metrics(model_name, directory='models'):
     """Load model metrics from file"""
     try:
-        with open(f'models/{model_name}_metrics.json', 'r') as f:
+        with open(os.path.join(directory, f'{model_name}_metrics.json'), 'r') as f:
             return json.load(f)
     except Exception as e:
         print(f"Error loading model metrics: {str(e)}")
         return {}
+
+def dump_artifact(artifact, path):
+    """Write an uncompressed (memory-mappable) artifact atomically"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
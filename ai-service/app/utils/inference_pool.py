@@ -0,0 +1,58 @@
+"""Bounded thread pool for CPU-bound work on the asyncio serving path.
+
+Work is keyed: while a computation for a key is in flight, further requests
+for the same key await that computation instead of queueing another one.
+Once max_pending computations are running or queued, new work is refused
+right away with PoolSaturated so callers can answer 503 instead of queueing
+without bound. Bookkeeping runs on the event loop thread only.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics
+
+COALESCED = metrics.counter('ai_async_coalesced_total', 'Requests that shared an in-flight computation')
+REJECTED = metrics.counter('ai_async_rejected_total', 'Requests refused because the inference pool was full')
+PENDING = metrics.gauge('ai_async_pending', 'Computations running or queued in the inference pool')
+
+class PoolSaturated(Exception):
+    """The pool already holds max_pending computations"""
+
+class InferencePool:
+    def __init__(self, max_workers=8, max_pending=64):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='inference')
+        self.max_pending = max_pending
+        self.pending = 0
+        self._in_flight = {}
+
+    async def run(self, fn, key=None):
+        """Run fn() in the pool; concurrent calls with the same key share one result"""
+        # A caller that goes away does not cancel work other callers are waiting on
+        return await asyncio.shield(self.submit(fn, key))
+
+    def submit(self, fn, key=None):
+        """Future for fn() in the pool, the in-flight one for key if any; raises PoolSaturated when full"""
+        if key is not None and key in self._in_flight:
+            COALESCED.inc()
+            return self._in_flight[key]
+
+        if self.pending >= self.max_pending:
+            REJECTED.inc()
+            raise PoolSaturated(f"{self.pending} computations pending")
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn)
+        self.pending += 1
+        PENDING.set(self.pending)
+        if key is not None:
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._finished(key, future))
+        return future
+
+    def _finished(self, key, future):
+        self.pending -= 1
+        PENDING.set(self.pending)
+        if key is not None and self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
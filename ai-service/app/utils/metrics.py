@@ -0,0 +1,107 @@
+"""Prometheus metrics on top of prometheus_client.
+
+With PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py does), every process
+writes its values to files in that directory and a scrape of any worker
+reports the whole server: counters and histograms summed over workers,
+gauges combined by their multiprocess mode. Without it, e.g. train.py or
+the Flask dev server, values stay in process memory.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CollectorRegistry, generate_latest
+from prometheus_client import Counter as _Counter
+from prometheus_client import Gauge as _Gauge
+from prometheus_client import Histogram as _Histogram
+from prometheus_client import multiprocess
+
+# Latency buckets in seconds, from table lookups (µs) up to full model loads (s)
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class _Metric:
+    """A prometheus_client metric taking its label values as keyword arguments"""
+
+    def __init__(self, metric, labels):
+        self._metric = metric
+        self._labels = labels
+
+    def _child(self, labels):
+        return self._metric.labels(**labels) if self._labels else self._metric
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    def inc(self, amount=1, **labels):
+        self._child(labels).inc(amount)
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down"""
+
+    def set(self, value, **labels):
+        self._child(labels).set(value)
+
+class Histogram(_Metric):
+    """Bucketed observations per label set"""
+
+    def observe(self, value, **labels):
+        self._child(labels).observe(value)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._registry = CollectorRegistry()
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, wrapper, metric_class, name, help_text, labels, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                metric = metric_class(name, help_text, labels, registry=self._registry, **kwargs)
+                self._metrics[name] = wrapper(metric, tuple(labels))
+            return self._metrics[name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._get_or_create(Counter, _Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=(), multiprocess_mode='livesum'):
+        """multiprocess_mode combines the workers' values, see prometheus_client.Gauge"""
+        return self._get_or_create(Gauge, _Gauge, name, help_text, labels, multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, _Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self):
+        """Prometheus text exposition format, of every worker in multiprocess mode"""
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry).decode()
+        return generate_latest(self._registry).decode()
+
+metrics = MetricsRegistry()
+
+STAGE_LATENCY = metrics.histogram(
+    'ai_stage_duration_seconds', 'Time spent per request stage (encode, inference, serialize)', ('model', 'stage'))
+PREDICTIONS = metrics.counter('ai_predictions_total', 'Predictions served per model', ('model',))
+FALLBACK_PREDICTIONS = metrics.counter(
+    'ai_fallback_predictions_total', 'Predictions answered by the random fallback per model', ('model',))
+MODEL_LOAD_SECONDS = metrics.gauge(
+    'ai_model_load_seconds', 'Duration of the last model load', ('model',), multiprocess_mode='mostrecent')
+MODEL_TRAIN_SECONDS = metrics.gauge(
+    'ai_model_train_seconds', 'Duration of the last model training', ('model',), multiprocess_mode='mostrecent')
+CACHE_HITS = metrics.counter('ai_cache_hits_total', 'Cache lookups answered from the cache', ('cache',))
+CACHE_MISSES = metrics.counter('ai_cache_misses_total', 'Cache lookups that missed or found an expired entry', ('cache',))
+CACHE_ENTRIES = metrics.gauge('ai_cache_entries', 'Entries held per cache, summed over live workers', ('cache',))
+
+@contextmanager
+def observe_stage(model, stage):
+    """Record the wall time of a block as one stage of a model's request path"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, model=model, stage=stage)
@@ -0,0 +1,87 @@
+"""Response payloads shared by the full service (main.py) and the lookup-only one (lite.py).
+
+Only the standard library and NumPy are used here, so importing it never
+pulls in pandas or scikit-learn.
+"""
+import os
+import random
+
+import numpy as np
+
+# Longest forecast horizon, in hours, accepted by /forecast/traffic
+MAX_FORECAST_HOURS = 168
+
+def traffic_response(location, congestion, now):
+    """Build the traffic prediction payload for a congestion level"""
+    # Generate prediction message based on congestion level
+    if congestion <= 3:
+        status = "Light"
+        message = f"Light traffic expected at {location}"
+    elif congestion <= 6:
+        status = "Moderate" 
+        message = f"Moderate traffic expected at {location}"
+    else:
+        status = "Heavy"
+        message = f"Heavy traffic expected at {location}"
+    
+    return {
+        "location": location,
+        "predicted_congestion": congestion,
+        "status": status,
+        "message": message,
+        "timestamp": now.isoformat(),
+        "confidence": round(random.uniform(0.7, 0.95), 2)
+    }
+
+def parse_forecast_args(args):
+    """(locations, hours, weather) from forecast query parameters, ValueError when invalid"""
+    locations = [l.strip() for l in args.get('locations', '').split(',') if l.strip()] or None
+    weather = args.get('weather', 'clear')
+    
+    try:
+        hours = int(args.get('hours', 24))
+    except ValueError:
+        raise ValueError("hours must be an integer")
+    if not 1 <= hours <= MAX_FORECAST_HOURS:
+        raise ValueError(f"hours must be between 1 and {MAX_FORECAST_HOURS}")
+    
+    return locations, hours, weather
+
+def forecast_grid(model, locations, hours, weather, now):
+    """Forecast header and the rounded (location x hour) congestion grid"""
+    known, timestamps, congestion = model.forecast(locations, hours, now, weather)
+    congestion = np.clip(np.rint(congestion), 1, 10).astype(int)
+    known_set = set(known)
+    header = {
+        "generated_at": now.isoformat(),
+        "hours": hours,
+        "weather": weather,
+        "timestamps": [t.isoformat() for t in timestamps],
+        "unknown_locations": [l for l in locations or [] if l not in known_set]
+    }
+    return header, known, congestion
+
+def forecast_payload(model, locations, hours, weather, now):
+    """Payload of a non-streamed /forecast/traffic"""
+    header, known, congestion = forecast_grid(model, locations, hours, weather, now)
+    return {**header, "forecast": dict(zip(known, congestion.tolist()))}
+
+class FileSnapshot:
+    """Contents of a file that another process replaces atomically, reread only when its mtime changes"""
+
+    def __init__(self, path):
+        self.path = path
+        # (body, mtime) replaced as one tuple, so concurrent readers never mix two versions
+        self._cached = (None, None)
+
+    def read(self):
+        """(body bytes, mtime) or None while the file does not exist"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._cached
+        if cached[1] != mtime:
+            with open(self.path, 'rb') as f:
+                cached = self._cached = (f.read(), mtime)
+        return cached
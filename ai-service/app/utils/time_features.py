@@ -0,0 +1,30 @@
+"""Calendar features shared by data processing, training and inference.
+
+Everything is derived with datetime64 arithmetic into uint8 arrays, so a
+year of per-minute rows costs four bytes per row instead of four int64
+pandas columns.
+"""
+import numpy as np
+
+# day_of_week follows datetime.weekday(): Monday is 0, Saturday and Sunday are >= 5
+WEEKEND_START = 5
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+def time_features(timestamps):
+    """hour, day_of_week, month and is_weekend uint8 arrays for an array of timestamps"""
+    ts = np.asarray(timestamps, dtype='datetime64[s]')
+    days = ts.astype('datetime64[D]')
+    day_of_week = ((days.astype(np.int64) + _EPOCH_WEEKDAY) % 7).astype(np.uint8)
+
+    return {
+        'hour': ((ts - days).astype('timedelta64[h]').astype(np.int64)).astype(np.uint8),
+        'day_of_week': day_of_week,
+        'month': (ts.astype('datetime64[M]').astype(np.int64) % 12 + 1).astype(np.uint8),
+        'is_weekend': (day_of_week >= WEEKEND_START).astype(np.uint8)
+    }
+
+def weekend_flag(day_of_week):
+    """Weekend flag for a scalar or array day_of_week, as int"""
+    return (np.asarray(day_of_week) >= WEEKEND_START).astype(int)
@@ -0,0 +1,5 @@
+"""WSGI entry point for production servers, see gunicorn.conf.py"""
+from main import app, load_models
+
+# With preload_app this runs once in the gunicorn master before forking
+load_models()
@@ -0,0 +1,16 @@
+#!/bin/sh
+# Seed the models volume with the artifacts trained into this image.
+#
+# docker-compose mounts a named volume over /app/models, which hides anything
+# the image put there. The image trains into /app/artifacts instead; they are
+# copied into the volume when it is empty or was seeded by an older image, and
+# models updated at runtime are kept until the next rebuild.
+set -e
+
+if ! cmp -s image-build models/.image-build 2>/dev/null; then
+    mkdir -p models
+    cp -a artifacts/. models/
+    cp image-build models/.image-build
+fi
+
+exec "$@"
@@ -0,0 +1,64 @@
+"""Gunicorn settings for serving the AI service in production.
+
+Every setting can be overridden through an AI_SERVICE_* environment variable.
+Models are loaded once in the master process (preload_app) and the forked
+workers share that read-only copy copy-on-write; the precomputed lookup
+tables are additionally memory-mapped from the artifacts, so their pages
+are shared through the page cache.
+
+For the asyncio serving path (see app/asgi.py), serve asgi:app with
+AI_SERVICE_WORKER_CLASS=uvicorn.workers.UvicornWorker; its inference pool is
+sized by AI_ASYNC_THREADS and AI_ASYNC_MAX_PENDING instead of threads.
+
+Replicas that only serve table lookups can run lite:app instead of wsgi:app
+(see app/lite.py): NumPy only, no pandas or scikit-learn, so workers start
+faster and need a fraction of the memory.
+
+Metrics are aggregated over the workers through prometheus_client's
+multiprocess mode: every process writes its values under
+PROMETHEUS_MULTIPROC_DIR (default /tmp/ai-service-metrics), which is
+emptied when a master starts, and a dead worker's live gauges are dropped.
+
+Graceful operations:
+    kill -HUP <master>    restart workers with the already loaded models
+    kill -USR2 <master>   start a new master that loads fresh artifacts,
+                          then send QUIT to the old master once it is up
+"""
+import multiprocessing
+import os
+import shutil
+
+# Set before the app, and with it prometheus_client, is imported
+METRICS_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/ai-service-metrics')
+
+# Emptied once per master before the app is preloaded; a HUP re-reads this file but keeps the values
+if os.environ.get('AI_SERVICE_METRICS_MASTER') != str(os.getpid()):
+    os.environ['AI_SERVICE_METRICS_MASTER'] = str(os.getpid())
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR)
+
+pythonpath = 'app'
+bind = os.environ.get('AI_SERVICE_BIND', '0.0.0.0:5000')
+
+workers = int(os.environ.get('AI_SERVICE_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('AI_SERVICE_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('AI_SERVICE_THREADS', 4))
+backlog = int(os.environ.get('AI_SERVICE_BACKLOG', 2048))
+
+timeout = int(os.environ.get('AI_SERVICE_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('AI_SERVICE_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('AI_SERVICE_KEEPALIVE', 5))
+
+# Recycle workers periodically to bound memory growth (0 disables)
+max_requests = int(os.environ.get('AI_SERVICE_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('AI_SERVICE_MAX_REQUESTS_JITTER', 0))
+
+preload_app = os.environ.get('AI_SERVICE_PRELOAD', '1') == '1'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('AI_SERVICE_LOG_LEVEL', 'info')
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
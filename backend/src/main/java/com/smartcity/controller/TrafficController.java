@@ -32,6 +32,15 @@ public class TrafficController {
         return ResponseEntity.ok(prediction);
     }
 
+    @GetMapping("/forecast")
+    public ResponseEntity<String> forecastTraffic(@RequestParam(defaultValue = "24") int hours) {
+        // Same horizon the AI service accepts
+        if (hours < 1 || hours > 168) {
+            return ResponseEntity.badRequest().body("hours must be between 1 and 168");
+        }
+        return ResponseEntity.ok(service.forecastTraffic(hours));
+    }
+
     @PostMapping("/initialize")
     public ResponseEntity<String> initializeData() {
         service.initializeSampleData();
@@ -25,6 +25,16 @@ public class AIService {
         }
     }
 
+    public String forecastTraffic(int hours) {
+        try {
+            String url = aiServiceUrl + "/forecast/traffic?hours=" + hours;
+            ResponseEntity<String> response = restTemplate.getForEntity(url, String.class);
+            return response.getBody();
+        } catch (Exception e) {
+            return "AI Service unavailable. Traffic forecast temporarily offline.";
+        }
+    }
+
     public String analyzeOperationsTrend() {
         try {
             String url = aiServiceUrl + "/analyze/trends";
@@ -50,6 +50,10 @@ public class TrafficService {
         return aiService.predictTraffic(location);
     }
 
+    public String forecastTraffic(int hours) {
+        return aiService.forecastTraffic(hours);
+    }
+
     public void initializeSampleData() {
         for (int i = 0; i < 50; i++) {
             for (String location : locations) {
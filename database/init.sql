@@ -74,7 +74,8 @@ CREATE TABLE IF NOT EXISTS emergency_incidents (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_type (incident_type),
     INDEX idx_status (status),
-    INDEX idx_reported (reported_at)
+    INDEX idx_reported (reported_at),
+    INDEX idx_resolved (resolved_at)
 );
 
 CREATE TABLE IF NOT EXISTS ai_predictions (